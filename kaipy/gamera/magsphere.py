@@ -59,6 +59,7 @@ class GamsphPipe(GameraPipe):
 		#2D equatorial grid, stretched polar (Ni,Nj*2+1)
 		self.xxi = [] ; self.yyi = []
 		self.xxc = [] ; self.yyc = []
+		self.xxcW = [] ; self.yycW = []
 
 		GameraPipe.__init__(self,fdir,ftag,doFast=doFast)
 
@@ -112,6 +113,9 @@ class GamsphPipe(GameraPipe):
 		# Get centers for stretched polar grid & BzD
 		self.xxc = 0.25 * (self.xxi[:-1, :-1] + self.xxi[1:, :-1] + self.xxi[:-1, 1:] + self.xxi[1:, 1:])
 		self.yyc = 0.25 * (self.yyi[:-1, :-1] + self.yyi[1:, :-1] + self.yyi[:-1, 1:] + self.yyi[1:, 1:])
+		# Centers with the first phi column repeated at the end (as kaiViz.reWrap), for closed contours
+		self.xxcW = np.concatenate((self.xxc, self.xxc[:, 0:1]), axis=1)
+		self.yycW = np.concatenate((self.yyc, self.yyc[:, 0:1]), axis=1)
 		r = np.sqrt(self.xxc ** 2.0 + self.yyc ** 2.0)
 		rm5 = r ** (-5.0)
 		self.BzD = -r * r * self.MagM * rm5
@@ -17,6 +17,11 @@ IDIR = 0
 JDIR = 1
 KDIR = 2
 
+#Raw data chunk cache used when reading restart tiles, large enough to hold
+#every chunk of a tile dataset so chunked/compressed reads decompress each chunk once
+RDCC_NBYTES = 64*1024*1024
+RDCC_NSLOTS = 65521
+
 #Push restart data to an MPI tiling
 #fInA is a restart file to pull attributes from
 # add oG and oM for one step older for reproducible restart.
@@ -43,8 +48,17 @@ def PushRestartMPI(outid, nRes, Ri, Rj, Rk, X, Y, Z, G, M, oG, oM, fInA, G0=None
 	"""
 	doGas0 = (G0 is not None)  # Make sure doGas0 is either True or False
 
+	# Tiles are written straight from the global arrays via hyperslab selections,
+	# which requires C-contiguous (k-j-i) memory. Callers often pass transposed grids.
+	X, Y, Z = np.ascontiguousarray(X), np.ascontiguousarray(Y), np.ascontiguousarray(Z)
+	G, M, oG, oM = np.ascontiguousarray(G), np.ascontiguousarray(M), np.ascontiguousarray(oG), np.ascontiguousarray(oM)
+	if (doGas0):
+		G0 = np.ascontiguousarray(G0)
+
 	print("Reading attributes from %s" % (fInA))
-	iH5 = h5py.File(fInA, 'r')
+	# Read the attributes once, they are copied into every output tile
+	with h5py.File(fInA, 'r') as iH5:
+		attrs = {ak: iH5.attrs[str(ak)] for ak in iH5.attrs.keys()}
 
 	Ns, Nv, Nk, Nj, Ni = G.shape
 	# Create output files
@@ -53,15 +67,12 @@ def PushRestartMPI(outid, nRes, Ri, Rj, Rk, X, Y, Z, G, M, oG, oM, fInA, G0=None
 	Nip = Ni // Ri
 
 	print("Splitting (%d,%d,%d) cells into (%d,%d,%d) x (%d,%d,%d) [Cells,MPI]" % (Ni, Nj, Nk, Nip, Njp, Nkp, Ri, Rj, Rk))
-	# Loop over output slices and create restarts
+	# Loop over output slices
 	for i in range(Ri):
 		for j in range(Rj):
 			for k in range(Rk):
 				fOut = kh5.genName(outid, i, j, k, Ri, Rj, Rk, nRes)
 
-				# Open output file
-				oH5 = h5py.File(fOut, 'w')
-
 				iS = i * Nip
 				iE = iS + Nip
 				jS = j * Njp
@@ -81,40 +92,42 @@ def PushRestartMPI(outid, nRes, Ri, Rj, Rk, X, Y, Z, G, M, oG, oM, fInA, G0=None
 				print("\tMPI (%d,%d,%d) = [%d,%d]x[%d,%d]x[%d,%d]" % (i, j, k, iS, iE, jS, jE, kS, kE))
 				print("\tGrid indices = (%d,%d)x(%d,%d)x(%d,%d)" % (iSg, iEg, jSg, jEg, kSg, kEg))
 
-				# Slice subgrids
-				ijkX = X[kSg:kEg, jSg:jEg, iSg:iEg]
-				ijkY = Y[kSg:kEg, jSg:jEg, iSg:iEg]
-				ijkZ = Z[kSg:kEg, jSg:jEg, iSg:iEg]
-
-				# Slice pieces out of gas and magflux
-				ijkG = G[:, :, kS:kE, jS:jE, iS:iE]
-				ijkM = M[:, kS:kE + 1, jS:jE + 1, iS:iE + 1]
-				ijkoG = oG[:, :, kS:kE, jS:jE, iS:iE]
-				ijkoM = oM[:, kS:kE + 1, jS:jE + 1, iS:iE + 1]
-				if (doGas0):
-					ijkG0 = G0[:, :, kS:kE, jS:jE, iS:iE]
-				# Write heavy variables
-				oH5.create_dataset("Gas", data=ijkG)
-				oH5.create_dataset("magFlux", data=ijkM)
-				oH5.create_dataset("oGas", data=ijkoG)
-				oH5.create_dataset("omagFlux", data=ijkoM)
+				# Selections for gas and magflux (heavy variables)
+				dsets = {}
+				dsets["Gas"] = (G, np.s_[:, :, kS:kE, jS:jE, iS:iE])
+				dsets["magFlux"] = (M, np.s_[:, kS:kE + 1, jS:jE + 1, iS:iE + 1])
+				dsets["oGas"] = (oG, np.s_[:, :, kS:kE, jS:jE, iS:iE])
+				dsets["omagFlux"] = (oM, np.s_[:, kS:kE + 1, jS:jE + 1, iS:iE + 1])
 				if (doGas0):
-					oH5.create_dataset("Gas0", data=ijkG0)
+					dsets["Gas0"] = (G0, np.s_[:, :, kS:kE, jS:jE, iS:iE])
 
-				# Write subgrid
-				oH5.create_dataset("X", data=ijkX)
-				oH5.create_dataset("Y", data=ijkY)
-				oH5.create_dataset("Z", data=ijkZ)
+				# Selections for subgrids
+				dsets["X"] = (X, np.s_[kSg:kEg, jSg:jEg, iSg:iEg])
+				dsets["Y"] = (Y, np.s_[kSg:kEg, jSg:jEg, iSg:iEg])
+				dsets["Z"] = (Z, np.s_[kSg:kEg, jSg:jEg, iSg:iEg])
 
-				# Transfer attributes to output
-				for ak in iH5.attrs.keys():
-					aStr = str(ak)
-					oH5.attrs.create(ak, iH5.attrs[aStr])
+				_PushTile(fOut, dsets, attrs)
 
-				# Close this output file
-				oH5.close()
-	# Close input file
-	iH5.close()
+
+#Write a single restart tile
+def _PushTile(fOut, dsets, attrs):
+	"""
+	Write one restart tile to its own file.
+
+	Args:
+		fOut (str): Output file name.
+		dsets (dict): Mapping of dataset name to a (C-contiguous array, selection) pair.
+			HDF5 reads the selected hyperslab straight from the array, no slice copy is made.
+		attrs (dict): Mapping of attribute name to value copied to the file root.
+	"""
+	with h5py.File(fOut, 'w') as oH5:
+		for dsName, (dsData, dsSel) in dsets.items():
+			dset = oH5.create_dataset(dsName, shape=dsData[dsSel].shape, dtype=dsData.dtype)
+			dset.write_direct(dsData, source_sel=dsSel)
+
+		# Transfer attributes to output
+		for ak, av in attrs.items():
+			oH5.attrs.create(ak, av)
 
 
 #Get full data from a tiled restart file
@@ -139,65 +152,75 @@ def PullRestartMPI(bStr, nRes, Ri, Rj, Rk, dIn=None, oH5=None):
 			- oG: oGas array with shape (Ns, Nv, Nk, Nj, Ni).
 			- oM: omagFlux array with shape (3, Nk+1, Nj+1, Ni+1).
 	"""
-	doInit = True
+	fIns = {}
 	for i in range(Ri):
 		for j in range(Rj):
 			for k in range(Rk):
 				fID = kh5.genName(bStr, i, j, k, Ri, Rj, Rk, nRes)
-				print("Reading from %s" % (fID))
-
-				# Start with input data
 				if (dIn is not None):
-					fIn = dIn + "/" + fID
+					fIns[i, j, k] = dIn + "/" + fID
 				else:
-					fIn = fID
-				iH5 = h5py.File(fIn, 'r')
-
-				if (doInit):
-					Ns, Nv, Nkp, Njp, Nip = iH5['Gas'].shape
-					doGas0 = ('Gas0' in iH5.keys())
-
-					Nk = Rk * Nkp
-					Nj = Rj * Njp
-					Ni = Ri * Nip
-					G = np.zeros((Ns, Nv, Nk, Nj, Ni))
-					oG = np.zeros((Ns, Nv, Nk, Nj, Ni))
-					if (doGas0):
-						G0 = np.zeros((Ns, Nv, Nk, Nj, Ni))
-					else:
-						G0 = None
-					M = np.zeros((3, Nk + 1, Nj + 1, Ni + 1))
-					oM = np.zeros((3, Nk + 1, Nj + 1, Ni + 1))
-					if (oH5 is not None):
-						for ka in iH5.attrs.keys():
-							aStr = str(ka)
-							# print(aStr)
-							oH5.attrs.create(ka, iH5.attrs[aStr])
-					doInit = False
-				iS = i * Nip
-				iE = iS + Nip
-				jS = j * Njp
-				jE = jS + Njp
-				kS = k * Nkp
-				kE = kS + Nkp
-
-				# print("MPI (%d,%d,%d) = [%d,%d]x[%d,%d]x[%d,%d]"%(i,j,k,iS,iE,jS,jE,kS,kE))
-
-				G[:, :, kS:kE, jS:jE, iS:iE] = iH5['Gas'][:]
-				oG[:, :, kS:kE, jS:jE, iS:iE] = iH5['oGas'][:]
-				if (doGas0):
-					G0[:, :, kS:kE, jS:jE, iS:iE] = iH5['Gas0'][:]
+					fIns[i, j, k] = fID
+
+	# Get sizes and attributes from the first tile
+	with h5py.File(fIns[0, 0, 0], 'r') as iH5:
+		Ns, Nv, Nkp, Njp, Nip = iH5['Gas'].shape
+		doGas0 = ('Gas0' in iH5.keys())
+		if (oH5 is not None):
+			for ka in iH5.attrs.keys():
+				aStr = str(ka)
+				oH5.attrs.create(ka, iH5.attrs[aStr])
+
+	Nk = Rk * Nkp
+	Nj = Rj * Njp
+	Ni = Ri * Nip
+	G = np.zeros((Ns, Nv, Nk, Nj, Ni))
+	oG = np.zeros((Ns, Nv, Nk, Nj, Ni))
+	if (doGas0):
+		G0 = np.zeros((Ns, Nv, Nk, Nj, Ni))
+	else:
+		G0 = None
+	M = np.zeros((3, Nk + 1, Nj + 1, Ni + 1))
+	oM = np.zeros((3, Nk + 1, Nj + 1, Ni + 1))
+
+	# Each tile is read straight into its piece of the global arrays
+	for (i, j, k), fIn in fIns.items():
+		print("Reading from %s" % (fIn))
+		iS = i * Nip
+		iE = iS + Nip
+		jS = j * Njp
+		jE = jS + Njp
+		kS = k * Nkp
+		kE = kS + Nkp
+
+		# print("MPI (%d,%d,%d) = [%d,%d]x[%d,%d]x[%d,%d]"%(i,j,k,iS,iE,jS,jE,kS,kE))
+
+		dsets = {}
+		dsets['Gas'] = (G, np.s_[:, :, kS:kE, jS:jE, iS:iE])
+		dsets['oGas'] = (oG, np.s_[:, :, kS:kE, jS:jE, iS:iE])
+		if (doGas0):
+			dsets['Gas0'] = (G0, np.s_[:, :, kS:kE, jS:jE, iS:iE])
+		dsets['magFlux'] = (M, np.s_[:, kS:kE + 1, jS:jE + 1, iS:iE + 1])
+		dsets['omagFlux'] = (oM, np.s_[:, kS:kE + 1, jS:jE + 1, iS:iE + 1])
+
+		_PullTile(fIn, dsets)
 
-				M[:, kS:kE + 1, jS:jE + 1, iS:iE + 1] = iH5['magFlux'][:]
-				oM[:, kS:kE + 1, jS:jE + 1, iS:iE + 1] = iH5['omagFlux'][:]
+	return G, M, G0, oG, oM
 
-				# Close up
-				iH5.close()
 
-	if (not doGas0):
-		G0 = None
+#Read a single restart tile into the global arrays
+def _PullTile(fIn, dsets):
+	"""
+	Read one restart tile into its piece of the global arrays.
 
-	return G, M, G0, oG, oM
+	Args:
+		fIn (str): Input file name.
+		dsets (dict): Mapping of dataset name to a (C-contiguous array, selection) pair.
+			The whole dataset is read straight into the selected hyperslab of the array.
+	"""
+	with h5py.File(fIn, 'r', rdcc_nbytes=RDCC_NBYTES, rdcc_nslots=RDCC_NSLOTS) as iH5:
+		for dsName, (dsData, dsSel) in dsets.items():
+			iH5[dsName].read_direct(dsData, dest_sel=dsSel)
 
 
 #Downscale a grid (with ghosts, k-j-i order)
@@ -433,7 +456,7 @@ def upVolt(G):
 
 
 #Downscale gas variable (G) on grid X,Y,Z (w/ ghosts) to halved grid
-def downGas(X,Y,Z,G,Xd,Yd,Zd):
+def downGas(X,Y,Z,G,Xd,Yd,Zd,dV=None,dVd=None):
 	"""
 	Downscale gas variables from a coarse grid to a fine grid.
 
@@ -445,13 +468,17 @@ def downGas(X,Y,Z,G,Xd,Yd,Zd):
 		Xd (ndarray): X-coordinates of the fine grid.
 		Yd (ndarray): Y-coordinates of the fine grid.
 		Zd (ndarray): Z-coordinates of the fine grid.
+		dV (ndarray, optional): Precomputed Volume(X,Y,Z). Defaults to None (computed here).
+		dVd (ndarray, optional): Precomputed Volume(Xd,Yd,Zd). Defaults to None (computed here).
 
 	Returns:
 		ndarray: Gas variables downscaled to the fine grid.
 	"""
 	Ns,Nv,Nk,Nj,Ni = G.shape
-	dV  = Volume(X ,Y ,Z )
-	dVd = Volume(Xd,Yd,Zd)
+	if (dV is None):
+		dV  = Volume(X ,Y ,Z )
+	if (dVd is None):
+		dVd = Volume(Xd,Yd,Zd)
 	print("Volume ratio (Coarse/Fine) = %f"%(dVd.sum()/dV.sum()))
 	Gd = np.zeros((Ns,Nv,Nk//2,Nj//2,Ni//2))
 	print("Downscaling gas variables ...")
@@ -475,7 +502,7 @@ def downGas(X,Y,Z,G,Xd,Yd,Zd):
 	return Gd
 	
 #Upscale gas variable (G) on grid X,Y,Z (w/ ghosts) to doubled grid
-def upGas(X, Y, Z, G, Xu, Yu, Zu):
+def upGas(X, Y, Z, G, Xu, Yu, Zu, dV=None, dVu=None):
 	"""
 	Upscales gas variables from a coarse grid to a finer grid.
 
@@ -487,6 +514,8 @@ def upGas(X, Y, Z, G, Xu, Yu, Zu):
 		Xu (ndarray): Fine grid X coordinates.
 		Yu (ndarray): Fine grid Y coordinates.
 		Zu (ndarray): Fine grid Z coordinates.
+		dV (ndarray, optional): Precomputed Volume(X,Y,Z). Defaults to None (computed here).
+		dVu (ndarray, optional): Precomputed Volume(Xu,Yu,Zu). Defaults to None (computed here).
 
 	Returns:
 		ndarray: Upscaled gas variables on the fine grid.
@@ -497,24 +526,21 @@ def upGas(X, Y, Z, G, Xu, Yu, Zu):
 	"""
 	Ns, Nv, Nk, Nj, Ni = G.shape
 
-	dV = Volume(X, Y, Z)
-	dVu = Volume(Xu, Yu, Zu)
+	if (dV is None):
+		dV = Volume(X, Y, Z)
+	if (dVu is None):
+		dVu = Volume(Xu, Yu, Zu)
 
 	print("Volume ratio (Coarse/Fine) = %f" % (dV.sum() / dVu.sum()))
-	Gu = np.zeros((Ns, Nv, 2 * Nk, 2 * Nj, 2 * Ni))
 	print("Upscaling gas variables ...")
-	# Loop over coarse grid
+	# Each coarse cell's content QdV is split over its 2x2x2 fine subcells weighted by
+	# subcell volume, so the fine density is QdV/vScl in every subcell of the block
+	vScl = dVu.reshape(Nk, 2, Nj, 2, Ni, 2).sum(axis=(1, 3, 5))  # Total volume of the finer subchunks
+	Gc = G * (dV / vScl)
+	Gu = Gc.repeat(2, axis=2).repeat(2, axis=3).repeat(2, axis=4)
 	for s in range(Ns):
 		for v in range(Nv):
 			print("\tUpscaling Species %d, Variable %d" % (s, v))
-			for k in range(Nk):
-				for j in range(Nj):
-					for i in range(Ni):
-						QdV = G[s, v, k, j, i] * dV[k, j, i]
-						dVijk = dVu[2 * k:2 * k + 2, 2 * j:2 * j + 2, 2 * i:2 * i + 2]  # Volumes of the finer subgrid
-						vScl = dVijk.sum()  # Total volume of the finer subchunks
-						QdVu = QdV * (dVijk / vScl)  # Give weighted contribution to each subcell
-						Gu[s, v, 2 * k:2 * k + 2, 2 * j:2 * j + 2, 2 * i:2 * i + 2] = QdVu / dVijk  # Scale back to density
 			# Test conservation
 			print("\t\tCoarse (Total) = %e" % (G[s, v, :, :, :] * dV).sum())
 			print("\t\tFine   (Total) = %e" % (Gu[s, v, :, :, :] * dVu).sum())
@@ -680,15 +706,11 @@ def downMIX(Q):
 		ndarray: Downmixed matrix of shape (Ni//2, Nj//2).
 	"""
 	Ni, Nj = Q.shape
-	Qr = np.zeros((Ni//2, Nj//2))
+	NiD = Ni//2
+	NjD = Nj//2
 
-	# Loop over coarse grid
-	for j in range(Nj//2):
-		for i in range(Ni//2):
-			i0 = 2*i
-			j0 = 2*j
-			Qij = Q[i0:i0+2, j0:j0+2].mean()
-			Qr[i, j] = Qij
+	# Average each 2x2 block of the fine grid (trailing odd row/column is dropped)
+	Qr = Q[:2*NiD, :2*NjD].reshape(NiD, 2, NjD, 2).mean(axis=(1, 3))
 	return Qr
 
 	
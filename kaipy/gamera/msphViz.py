@@ -436,7 +436,7 @@ def PlotEqB(gsph, nStp, xyBds, Ax, AxCB=None, doClear=True, doDeco=True, doBz=Fa
 		dbz = gsph.DelBz(nStp)
 		Ax.pcolormesh(gsph.xxi, gsph.yyi, dbz, cmap=dbCM, norm=vDB)
 
-	Ax.contour(kv.reWrap(gsph.xxc), kv.reWrap(gsph.yyc), kv.reWrap(Bz), [0.0], colors=bz0Col, linewidths=cLW)
+	Ax.contour(gsph.xxcW, gsph.yycW, kv.reWrap(Bz), [0.0], colors=bz0Col, linewidths=cLW)
 
 	kv.SetAx(xyBds, Ax)
 
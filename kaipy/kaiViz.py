@@ -1,7 +1,11 @@
 #Various scripts to support visualization of Kaiju data
 
 # Standard modules
+import copy
+import functools
+import io
 import os
+import struct
 from operator import sub
 
 # Third-party modules
@@ -9,79 +13,127 @@ import h5py
 import numpy as np
 from PIL import Image
 import matplotlib as mpl
-import matplotlib.pyplot as plt
+from matplotlib import cbook
+from matplotlib.collections import LineCollection
 from matplotlib.colors import LogNorm
 from matplotlib.colors import Normalize
 from matplotlib.colors import SymLogNorm
+try:
+    from matplotlib.colors import TwoSlopeNorm
+except ImportError:
+    # Matplotlib < 3.2, use MidpointNormalize
+    TwoSlopeNorm = None
+from matplotlib.patches import PathPatch
 from matplotlib.patches import Wedge
+from matplotlib.path import Path
 from matplotlib import ticker
 
 # Kaipy modules
 from kaipy.kdefs import *
 
+#pyplot, imported on first use by _pyplot. Scripts that import kaiViz without plotting skip its ~0.3 s import
+_PLT = None
+
+def _pyplot():
+    """
+    Import matplotlib.pyplot on first use and cache it in _PLT.
+
+    Returns:
+        module: matplotlib.pyplot.
+    """
+    global _PLT
+    if _PLT is None:
+        import matplotlib.pyplot
+        _PLT = matplotlib.pyplot
+    return _PLT
+
+def __getattr__(name):
+    # Keep kv.plt (and "from kaipy.kaiViz import plt") working without the module-level import
+    if name == 'plt':
+        return _pyplot()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+#Switch to the off-screen Agg backend, e.g. as initializer of plotting worker processes
+def useAgg():
+    """
+    Select the Agg backend, for processes that only render plots to files.
+
+    Returns:
+        None
+    """
+    plt = _pyplot()
+    plt.switch_backend('Agg')
+
 
 #Create 2D equatorial grid (Ni,Nj*2+1) from lfm/egg-style
-# def genEQGrid(fIn):
-#     with h5py.File(fIn,'r') as hf:
-#         Nk,Nj,Ni = hf.get("X")[()].shape
-#         X3 = hf.get("X")[()].T
-#         Y3 = hf.get("Y")[()].T
-#         Z3 = hf.get("Z")[()].T
-#     print("Ni,Nj,Nk = %d,%d,%d"%(Ni,Nj,Nk))
-#     #Create grid
-#     Nr = Ni-1
-#     Np = 2*(Nj-1)
-#     xx = np.zeros((Nr+1,Np+1))
-#     yy = np.zeros((Nr+1,Np+1))
-
-#     for i in range(Nr+1):
-#         for j in range(Nj):
-#             xx[i,j] = X3[i,j,0]
-#             yy[i,j] = Y3[i,j,0]
-#         for j in range(Nj,Np+1):
-#             jp = Np-j
-#             xx[i,j] =  X3[i,jp,0]
-#             yy[i,j] = -Y3[i,jp,0]
-#     return xx,yy
-# def getEQVar(fIn,StpN=0,vID="D"):
-#     gID = "Step#%d"%(StpN)
-#     with h5py.File(fIn,'r') as hf:
-#         V = hf.get(gID).get(vID)[()].T
-#         Ni,Nj,Nk = V.shape #Cell-centered (not node)
-#     Nr = Ni
-#     Np = 2*(Nj)
-#     kp = (Nk)/2
-#     vv = np.zeros((Nr,Np))
-#     for i in range(Nr):
-#         for j in range(Np):
-#             if (j>=Nj):
-#                 jp = Np-j-1
-#                 vv[i,j] = V[i,jp,kp]
-#             else:
-#                 jp = j
-#                 vv[i,j] = V[i,jp,0]
-#     return vv
+def genEQGrid(fIn):
+    """
+    Create the 2D equatorial grid from an lfm/egg-style grid file.
+
+    The upper half-plane is the k=0 slice of the grid, the lower half-plane is its mirror in y.
+
+    Parameters:
+        fIn (str): The grid file, with node-centered X, Y and Z datasets.
+
+    Returns:
+        tuple: The grid corners (xx, yy), each of shape (Ni, 2*(Nj-1)+1).
+    """
+    with h5py.File(fIn, 'r') as hf:
+        X3 = hf.get("X")[()].T
+        Y3 = hf.get("Y")[()].T
+    Ni, Nj, Nk = X3.shape
+    Np = 2*(Nj-1)
+    xx = np.zeros((Ni, Np+1))
+    yy = np.zeros((Ni, Np+1))
+    xx[:, :Nj] = X3[:, :, 0]
+    yy[:, :Nj] = Y3[:, :, 0]
+    #Mirror j=Nj-2..0 into the lower half-plane
+    xx[:, Nj:] = X3[:, Nj-2::-1, 0]
+    yy[:, Nj:] = -Y3[:, Nj-2::-1, 0]
+    return xx, yy
+
+#Get cell-centered equatorial slice of variable vID, matching genEQGrid
+def getEQVar(fIn, StpN=0, vID="D"):
+    """
+    Get the equatorial slice of a cell-centered variable on the genEQGrid layout.
+
+    Parameters:
+        fIn (str): The data file.
+        StpN (int, optional): The step number. Defaults to 0.
+        vID (str, optional): The variable name. Defaults to "D".
+
+    Returns:
+        numpy.ndarray: The equatorial values, of shape (Ni, 2*Nj).
+    """
+    gID = "Step#%d"%(StpN)
+    with h5py.File(fIn, 'r') as hf:
+        V = hf.get(gID).get(vID)[()].T
+    Ni, Nj, Nk = V.shape #Cell-centered (not node)
+    kp = Nk//2
+    vv = np.zeros((Ni, 2*Nj))
+    vv[:, :Nj] = V[:, :, 0]
+    vv[:, Nj:] = V[:, ::-1, kp]
+    return vv
 
 #Calculate equatorial Bz-D
-# def getEQBzD(xx,yy,MagM=-EarthM0g):
-#     Nip,Njp = xx.shape
-#     Ni = Nip-1
-#     Nj = Njp-1
-
-#     BzD = np.zeros((Ni,Nj))
-#     xxc = np.zeros((Ni,Nj))
-#     yyc = np.zeros((Ni,Nj))
-
-#     for i in range(Ni):
-#         for j in range(Nj):
-#             xc = 0.25*(xx[i,j]+xx[i+1,j]+xx[i,j+1]+xx[i+1,j+1])
-#             yc = 0.25*(yy[i,j]+yy[i+1,j]+yy[i,j+1]+yy[i+1,j+1])
-#             xxc[i,j] = xc
-#             yyc[i,j] = yc
-#             r = np.sqrt(xc**2.0+yc**2.0)
-#             rm5 = r**(-5.0)
-#             BzD[i,j] = -r*r*MagM*rm5
-#     return xxc,yyc,BzD
+def getEQBzD(xx, yy, MagM=-EarthM0g):
+    """
+    Calculate the equatorial dipole Bz at the cell centers of a 2D grid.
+
+    Parameters:
+        xx (numpy.ndarray): The x grid corners.
+        yy (numpy.ndarray): The y grid corners.
+        MagM (float, optional): The dipole moment. Defaults to -EarthM0g.
+
+    Returns:
+        tuple: The cell centers (xxc, yyc) and the dipole Bz, BzD.
+    """
+    xxc = 0.25*(xx[:-1, :-1] + xx[1:, :-1] + xx[:-1, 1:] + xx[1:, 1:])
+    yyc = 0.25*(yy[:-1, :-1] + yy[1:, :-1] + yy[:-1, 1:] + yy[1:, 1:])
+    #-r^2*M*r^-5 = -M*r^-3
+    BzD = -MagM/(xxc**2.0 + yyc**2.0)**1.5
+    return xxc, yyc, BzD
 
 #---------------------------------
 #Matplotlib helpers
@@ -105,6 +157,7 @@ def SetAx(xyBds=[-1, 1, -1, 1], ax=None, Adj='box'):
     Returns:
         None
     """
+    plt = _pyplot()
     # If no Axes object is specified, fetch the current Axes object.
     if ax is None:
         ax = plt.gca()
@@ -120,40 +173,22 @@ def SetAx(xyBds=[-1, 1, -1, 1], ax=None, Adj='box'):
 
 #Set axis labels and locations
 def SetAxLabs(Ax, xLab, yLab, doBot=True, doLeft=True, fs="medium"):
-    """Set axis plot bounds and aspect ratio.
-
-    Ensure that the plot has an equal aspect ratio and that the axis limits
-    are set to the specified values.
+    """Set the x and y axis labels for a given matplotlib Axes object.
 
     Parameters:
-        xyBds : list of 4 float, optional, default [-1, 1, -1, 1]
-            Axis limits for x and y as (xmin, xmax, ymin, ymax).
-        ax: matplotlib.Axes, optional, default None
-            Axes object to modify.
-        Adj: str, optional, default 'box
-            Specify what aspect of the plot to adjust to achieve equal aspect
-            ratio.
+        Ax (matplotlib.axes.Axes): The Axes object to set the labels for.
+        xLab (str): The label for the x-axis. If None, the x labels and ticks are hidden.
+        yLab (str): The label for the y-axis. If None, the y labels and ticks are hidden.
+        doBot (bool, optional): Whether to display the x-axis labels and ticks at the bottom. Default is True.
+        doLeft (bool, optional): Whether to display the y-axis labels and ticks on the left. Default is True.
+        fs (str, optional): The font size for the labels. Default is "medium".
 
     Returns:
         None
     """
-    # """Set the x and y axis labels for a given matplotlib Axes object.
-
-    # Parameters
-    # ----------
-    # Ax (matplotlib.axes.Axes): The Axes object to set the labels for.
-    # xLab (str): The label for the x-axis.
-    # yLab (str): The label for the y-axis.
-    # doBot (bool, optional): Whether to display the x-axis labels and ticks at the bottom. Default is True.
-    # doLeft (bool, optional): Whether to display the y-axis labels and ticks on the left. Default is True.
-    # fs (str, optional): The font size for the labels. Default is "medium".
-
-    # Returns
-    # -------
-    # None
-    # """
-    Ax.set_xlabel(xLab, fontsize=fs)
-    Ax.set_ylabel(yLab, fontsize=fs)
+    # Each label is set once, a hidden axis gets an empty one
+    Ax.set_xlabel('' if xLab is None else xLab, fontsize=fs)
+    Ax.set_ylabel('' if yLab is None else yLab, fontsize=fs)
     if not doBot:
         Ax.xaxis.tick_top()
         Ax.xaxis.set_label_position('top')
@@ -161,16 +196,12 @@ def SetAxLabs(Ax, xLab, yLab, doBot=True, doLeft=True, fs="medium"):
         Ax.yaxis.tick_right()
         Ax.yaxis.set_label_position('right')
 
-    # Kill labels if not string is None
+    # Kill labels and ticks if string is None
     if xLab is None:
-        Ax.xaxis.label.set_visible(False)
-        Ax.xaxis.set_visible(False)
-        plt.setp(Ax.get_xticklabels(), visible=False)
+        Ax.tick_params(axis='x', which='both', bottom=False, top=False, labelbottom=False, labeltop=False)
 
     if yLab is None:
-        Ax.yaxis.label.set_visible(False)
-        Ax.yaxis.set_visible(False)
-        plt.setp(Ax.get_yticklabels(), visible=False)
+        Ax.tick_params(axis='y', which='both', left=False, right=False, labelleft=False, labelright=False)
 
 #Set X axis to labels to well formatted date time
 def SetAxDate(Ax, fmt='%H:%M \n%Y-%m-%d'):
@@ -186,6 +217,9 @@ def SetAxDate(Ax, fmt='%H:%M \n%Y-%m-%d'):
     Ax.xaxis_date()
     Ax.xaxis.set_major_formatter(mpl.dates.DateFormatter(fmt))
 
+#Cached Earth half-disk paths for addEarth2D, keyed by radius
+_EARTH_PATHS = {}
+
 #Adds 2D earth w/ dawn/dusk
 def addEarth2D(Re=1, angle=-90, ax=None):
     """
@@ -197,18 +231,22 @@ def addEarth2D(Re=1, angle=-90, ax=None):
         ax (matplotlib.axes.Axes): The axes to which the Earth will be added. If None, the current axes will be used.
 
     Returns:
-        list: A list containing the two Wedge objects representing the Earth.
+        list: A list containing the two PathPatch objects (day/night half-disks) representing the Earth.
     """
+    plt = _pyplot()
     
 
     if ax is None:
         ax = plt.gca()
     colors=('w','k')
-    center = 0
-    theta1, theta2 = angle, angle + 180
-
-    w1 = Wedge(center, Re,-90,90,   fc=colors[0],ec='k')
-    w2 = Wedge(center, Re, 90, -90, fc=colors[1],ec='k')
+    if Re not in _EARTH_PATHS:
+        # Build the half-disk paths once per radius, Path.wedge is the unit wedge
+        _EARTH_PATHS[Re] = [Path(Path.wedge(t1, t2).vertices*Re, Path.wedge(t1, t2).codes)
+                            for t1, t2 in ((-90, 90), (90, -90))]
+    pDay, pNight = _EARTH_PATHS[Re]
+
+    w1 = PathPatch(pDay,   fc=colors[0],ec='k')
+    w2 = PathPatch(pNight, fc=colors[1],ec='k')
     for wedge in [w1, w2]:
         ax.add_artist(wedge)
     return [w1, w2]
@@ -225,6 +263,7 @@ def DrawCut(Rin=2.5, ax=None):
     Returns:
         matplotlib.patches.Wedge: The created Wedge object representing the cut.
     """
+    plt = _pyplot()
     
     if ax is None:
         ax = plt.gca()
@@ -245,14 +284,19 @@ def reWrap(V):
         numpy.ndarray: The re-wrapped 2D array with an extra column.
     """
     Ni, Nj = V.shape
-    Vp = np.zeros((Ni, Nj+1))
-    Vp[:, 0:Nj] = V
-    Vp[:, -1] = V[:, 0]
+    # Keep Fortran-ordered (e.g. transposed) inputs in the same layout, with a single allocation
+    order = 'F' if (V.flags.f_contiguous and not V.flags.c_contiguous) else 'C'
+    Vp = np.empty((Ni, Nj+1), dtype=V.dtype, order=order)
+    Vp[:, :Nj] = V
+    Vp[:, Nj] = V[:, 0]
     return Vp
 
 #Image files
+#Non-PNG raster formats savePic trims in memory
+rasterFormats = ('jpg', 'jpeg', 'tif', 'tiff', 'webp')
+
 #Wrapper to save (and trim) figure
-def savePic(fOut, dpiQ=300, doTrim=True, bLenX=20, bLenY=None, doClose=False, doEps=False, saveFigure=None):
+def savePic(fOut, dpiQ=300, doTrim=True, bLenX=20, bLenY=None, doClose=False, doEps=False, saveFigure=None, pngLevel=1):
     """
     Save a matplotlib figure to a file.
 
@@ -265,22 +309,45 @@ def savePic(fOut, dpiQ=300, doTrim=True, bLenX=20, bLenY=None, doClose=False, do
         doClose (bool): Whether to close all figures after saving (default: False).
         doEps (bool): Whether to save the figure in EPS format (default: False).
         saveFigure (matplotlib figure): A predefined figure to plot into (default: None).
+        pngLevel (int): zlib compression level (0-9) used for PNG output (default: 1, fastest).
+
+    Note:
+        Raster output is rendered once and trimmed in memory, bbox_inches='tight' (a second
+        render pass) is only used to trim vector formats.
 
     Returns:
         Image File saved to disk.
     """
+    plt = _pyplot()
     if doEps:
         if saveFigure is None:
             plt.savefig(fOut, dpi=dpiQ, format='eps')
         else:
             saveFigure.savefig(fOut, dpi=dpiQ, format='eps')
     else:
-        if saveFigure is None:
-            plt.savefig(fOut, dpi=dpiQ)
+        fig = plt.gcf() if saveFigure is None else saveFigure
+        fBase, fExt = os.path.splitext(fOut)
+        fmt = fExt[1:].lower()
+        if not fmt:
+            # Same as savefig, append the default extension
+            fmt = mpl.rcParams['savefig.format']
+            fOut = fBase + '.' + fmt
+        if fmt == 'png' and doTrim:
+            # Rasterize straight to an RGBA buffer, trim it in memory and encode the PNG once
+            Q = trimArray(renderRGBA(fig, dpiQ), bLenX, bLenY)
+            Image.fromarray(Q).save(fOut, format='png', optimize=False, compress_level=pngLevel)
+        elif fmt == 'png':
+            # PNG encoding dominates save time at high dpi, default zlib level is slow
+            fig.savefig(fOut, dpi=dpiQ, pil_kwargs={'compress_level': pngLevel, 'optimize': False})
+        elif fmt in rasterFormats and doTrim:
+            # Same in-memory trim, these formats have no alpha channel (or don't need it)
+            Q = trimArray(renderRGBA(fig, dpiQ), bLenX, bLenY)
+            Image.fromarray(Q).convert('RGB').save(fOut)
+        elif doTrim:
+            # Vector formats can't be trimmed as images, let matplotlib crop to the tight bbox
+            fig.savefig(fOut, dpi=dpiQ, bbox_inches='tight', pad_inches=bLenX/dpiQ)
         else:
-            saveFigure.savefig(fOut, dpi=dpiQ)
-        if doTrim:
-            trimFig(fOut, bLenX, bLenY)
+            fig.savefig(fOut, dpi=dpiQ)
 
     if doClose:
         if saveFigure is None:
@@ -289,7 +356,38 @@ def savePic(fOut, dpiQ=300, doTrim=True, bLenX=20, bLenY=None, doClose=False, do
             plt.close(saveFigure)
 
 
-#Use imagemagick to trim whitespace off figure
+#Render figure with Agg into an RGBA array
+def renderRGBA(fig, dpiQ=300):
+    """
+    Rasterize a matplotlib figure into an RGBA array without going through an image file.
+
+    Parameters:
+        fig (matplotlib.figure.Figure): The figure to render.
+        dpiQ (int): The resolution of the rendered figure in dots per inch (default: 300).
+
+    Returns:
+        numpy.ndarray: uint8 array of shape (Ny, Nx, 4).
+    """
+    # Imported here, the Agg backend pulls in most of matplotlib's drawing machinery
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    if isinstance(fig.canvas, FigureCanvasAgg):
+        # Draw straight into the Agg buffer, skipping savefig's print_figure machinery
+        dpi0 = fig.dpi
+        fig.dpi = dpiQ
+        try:
+            buf, (Nx, Ny) = fig.canvas.print_to_buffer()
+        finally:
+            fig.dpi = dpi0
+        return np.frombuffer(buf, dtype=np.uint8).reshape(Ny, Nx, 4)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='rgba', dpi=dpiQ)
+    # Agg canvas size, same truncation matplotlib uses for the renderer
+    Nx, Ny = (int(v) for v in fig.get_size_inches()*dpiQ)
+    return np.frombuffer(buf.getbuffer(), dtype=np.uint8).reshape(Ny, Nx, 4)
+
+
+#Trim whitespace off figure (in-process, equivalent to imagemagick's trim+border)
 #doEven: Guarantee even number of pixels in X/Y
 def trimFig(fName, bLenX=20, bLenY=None, doEven=True):
     """
@@ -302,32 +400,59 @@ def trimFig(fName, bLenX=20, bLenY=None, doEven=True):
         doEven (bool): Flag indicating whether to resize the image to have even dimensions. Default is True.
 
     Returns:
-        Image file saved to disk.
+        tuple: The width and height of the trimmed image, which is saved to disk.
+    """
+    with Image.open(fName) as img:
+        fmt = img.format
+        Q = trimArray(np.asarray(img), bLenX, bLenY, doEven)
+
+    saveArgs = {}
+    if fmt == 'PNG':
+        # Fast zlib level, the default (6) dominates save time for little size gain
+        saveArgs = {'optimize': False, 'compress_level': 1}
+    Image.fromarray(Q).save(fName, format=fmt, **saveArgs)
+    Ny, Nx = Q.shape[:2]
+    return Nx, Ny
+
+
+def trimArray(Q, bLenX=20, bLenY=None, doEven=True):
     """
+    Trims the background off an image array and pads it with a white border.
 
+    The background color is taken from the top-left pixel (as imagemagick's -trim does).
+
+    Parameters:
+        Q (numpy.ndarray): Image array of shape (Ny, Nx) or (Ny, Nx, Nc) with uint8 values.
+        bLenX (int): The length of the border to be added on the X-axis. Default is 20.
+        bLenY (int): The length of the border to be added on the Y-axis. If not provided, it will be set to bLenX.
+        doEven (bool): Flag indicating whether to crop the result to have even dimensions. Default is True.
 
+    Returns:
+        numpy.ndarray: The trimmed and padded image array.
+    """
     if bLenY is None:
         bLenY = bLenX
 
-    ComS = 'convert -trim -border %dx%d -bordercolor "#FFFFFF" ' % (bLenX, bLenY) + fName + ' ' + fName
-    os.system(ComS)
+    isBG = (Q == Q[0, 0])
+    if Q.ndim == 3:
+        isBG = isBG.all(axis=-1)
+    rows = np.flatnonzero(~isBG.all(axis=1))
+    cols = np.flatnonzero(~isBG.all(axis=0))
+    if len(rows) > 0:
+        Q = Q[rows[0]:rows[-1]+1, cols[0]:cols[-1]+1]
 
-    if doEven:
-        Nx, Ny = picSz(fName)
-
-        while (Nx % 2) != 0:
-            ShaveX(fName)
-            Nx, Ny = picSz(fName)
+    # Add white border
+    padW = ((bLenY, bLenY), (bLenX, bLenX)) + ((0, 0),)*(Q.ndim-2)
+    Q = np.pad(Q, padW, mode='constant', constant_values=255)
 
-        while (Ny % 2) != 0:
-            ShaveY(fName)
-            Nx, Ny = picSz(fName)
+    if doEven:
+        # Shave one pixel off the right/bottom if needed
+        Ny, Nx = Q.shape[:2]
+        Q = Q[:Ny - (Ny % 2), :Nx - (Nx % 2)]
+    return Q
 
-        Nx, Ny = picSz(fName)
-        if (Nx % 2) != 0 or (Ny % 2) != 0:
-            print("Parity failure on pic sizing")
-            print(Nx, Ny)
 
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
 
 def picSz(fName):
     """
@@ -340,7 +465,12 @@ def picSz(fName):
         tuple: A tuple containing the width and height of the image.
     """
 
-    
+    with open(fName, 'rb') as f:
+        head = f.read(24)
+    if head[:8] == PNG_SIGNATURE and head[12:16] == b'IHDR':
+        # Width and height are the first fields of the PNG header chunk
+        Nx, Ny = struct.unpack('>II', head[16:24])
+        return Nx, Ny
     with Image.open(fName) as img:
         Nx, Ny = img.size
     return Nx, Ny
@@ -355,21 +485,25 @@ def ShaveX(fName):
     Returns:
         fName file is cropped by one pixel on the right side.
     """
-    ComS = 'convert -crop -1+0 +repage ' + fName + ' ' + fName
-    os.system(ComS)
+    with Image.open(fName) as img:
+        img.load()
+    Nx, Ny = img.size
+    img.crop((0, 0, Nx-1, Ny)).save(fName)
 
 def ShaveY(fName):
     """
-    Shave one pixel from the top of the image.
+    Shave one pixel from the bottom of the image.
 
     Parameters:
         fName (str): The file name of the image.
 
     Returns:
-        fName file is cropped by one pixel on the top.
+        fName file is cropped by one pixel on the bottom.
     """
-    ComS = 'convert -crop +0-1 +repage ' + fName + ' ' + fName
-    os.system(ComS)
+    with Image.open(fName) as img:
+        img.load()
+    Nx, Ny = img.size
+    img.crop((0, 0, Nx, Ny-1)).save(fName)
 
 #---------------------------------
 #Create colorbar with specified midpoint (grabbed from stack overflow)
@@ -393,15 +527,31 @@ class MidpointNormalize(Normalize):
 
     """
 
+    _y = np.array([0.0, 0.5, 1.0])
+
     def __init__(self, vmin=None, vmax=None, midpoint=None, clip=False):
         self.midpoint = midpoint
         Normalize.__init__(self, vmin, vmax, clip)
+        self._update()
+
+    def _update(self):
+        # Interpolation knots, rebuilt only when vmin/midpoint/vmax change
+        self._knots = (self.vmin, self.midpoint, self.vmax)
+        self._x = np.array(self._knots, dtype=float) if None not in self._knots else None
+
+    def autoscale_None(self, A):
+        Normalize.autoscale_None(self, A)
+        self._update()
 
     def __call__(self, value, clip=None):
-        # I'm ignoring masked values and all kinds of edge cases to make a
+        # I'm ignoring clipping and all kinds of edge cases to make a
         # simple example...
-        x, y = [self.vmin, self.midpoint, self.vmax], [0, 0.5, 1]
-        return np.ma.masked_array(np.interp(value, x, y))
+        if self._knots != (self.vmin, self.midpoint, self.vmax):
+            self._update()
+        vN = np.interp(np.asarray(value), self._x, self._y)
+        if np.ma.isMaskedArray(value):
+            return np.ma.masked_array(vN, mask=np.ma.getmask(value))
+        return vN
 
 #Create norm object for MPL
 def genNorm(vMin, vMax=None, doLog=False, doSymLog=False, midP=None, linP=1.0):
@@ -421,7 +571,8 @@ def genNorm(vMin, vMax=None, doLog=False, doSymLog=False, midP=None, linP=1.0):
 
     Note:
         If vMax is not provided, the absolute value of vMin is used as both vMin and vMax.
-        If midP is not provided, midpoint normalization is not used.
+        If midP is not provided, midpoint normalization is not used. Otherwise TwoSlopeNorm is used,
+        falling back to MidpointNormalize on old matplotlib or if midP is not strictly inside (vMin, vMax).
         If doLog is True, logarithmic normalization is used.
         If doSymLog is True, symmetric logarithmic normalization is used.
         If none of the above conditions are met, linear normalization is used.
@@ -432,13 +583,29 @@ def genNorm(vMin, vMax=None, doLog=False, doSymLog=False, midP=None, linP=1.0):
         vMin = -np.abs(vMin)
         vMax = np.abs(vMin)
 
+    try:
+        vN = copy.copy(_makeNorm(vMin, vMax, doLog, doSymLog, midP, linP))
+    except TypeError:
+        # Unhashable arguments (e.g. arrays), build a fresh norm
+        return _makeNorm.__wrapped__(vMin, vMax, doLog, doSymLog, midP, linP)
+    # The copy must not share the cached norm's callbacks, they tie it to its colorbar/mappable
+    if hasattr(vN, 'callbacks'):
+        vN.callbacks = cbook.CallbackRegistry(signals=["changed"])
+    return vN
+
+#Build the norm for genNorm, cached since Log/SymLog norms are slow to construct
+@functools.lru_cache(maxsize=256)
+def _makeNorm(vMin, vMax, doLog, doSymLog, midP, linP):
     if midP is None:
         doMid = False
     else:
         doMid = True
 
     if doMid:
-        vN = MidpointNormalize(vmin=vMin, vmax=vMax, midpoint=midP)
+        if TwoSlopeNorm is not None and vMin < midP < vMax:
+            vN = TwoSlopeNorm(vcenter=midP, vmin=vMin, vmax=vMax)
+        else:
+            vN = MidpointNormalize(vmin=vMin, vmax=vMax, midpoint=midP)
     elif doLog:
         vN = LogNorm(vmin=vMin, vmax=vMax)
     elif doSymLog:
@@ -449,6 +616,31 @@ def genNorm(vMin, vMax=None, doLog=False, doSymLog=False, midP=None, linP=1.0):
     return vN
 
 
+#Colormaps already looked up by getCmap, keyed by name
+_CMAP_CACHE = {}
+
+def getCmap(cM):
+    """
+    Look up a colormap, caching lookups by name.
+
+    Parameters:
+        cM (str or Colormap): The colormap name, or a colormap (returned as is).
+
+    Returns:
+        cmData (Colormap): The colormap.
+    """
+    if not isinstance(cM, str):
+        return _pyplot().get_cmap(cM)
+    cmData = _CMAP_CACHE.get(cM)
+    if cmData is None:
+        if hasattr(mpl, 'colormaps'):
+            cmData = mpl.colormaps[cM]
+        else:
+            # Matplotlib < 3.5
+            cmData = _pyplot().get_cmap(cM)
+        _CMAP_CACHE[cM] = cmData
+    return cmData
+
 #Create colorbar object into specified axis
 def genCB(AxCB, vN, cbT="Title", cM="viridis", doVert=False, cbSz="medium", Ntk=None):
     """
@@ -473,7 +665,7 @@ def genCB(AxCB, vN, cbT="Title", cM="viridis", doVert=False, cbSz="medium", Ntk=
         cbOr = "vertical"
     else:
         cbOr = "horizontal"
-    cmData = plt.get_cmap(cM)
+    cmData = getCmap(cM)
     cb = mpl.colorbar.ColorbarBase(AxCB, cmap=cmData, norm=vN, orientation=cbOr)
     if Ntk is not None:
         cb.locator = ticker.MaxNLocator(nbins=Ntk)
@@ -484,6 +676,100 @@ def genCB(AxCB, vN, cbT="Title", cM="viridis", doVert=False, cbSz="medium", Ntk=
     return cb
 
 
+def decimateMinMax(t, y, n_out):
+    """
+    Decimate a time series to at most n_out points, keeping the min and max of each bin.
+
+    Drawing a line with many more points than the axis has pixels costs time without
+    changing the raster, so only the extremes of each bin are kept, in time order.
+    NaN gaps are kept for bins that contain no finite values.
+
+    Parameters:
+        t (numpy.ndarray): The sample times.
+        y (numpy.ndarray): The sample values, same length as t.
+        n_out (int): The maximum number of points to return.
+
+    Returns:
+        tuple: The decimated (t, y).
+    """
+    t = np.asarray(t)
+    y = np.asarray(y, dtype=np.float64)
+    N = len(y)
+    nBin = max(n_out // 2, 1)
+    if N <= n_out:
+        return t, y
+    bSz = N // nBin
+    yb = y[:nBin*bSz].reshape(nBin, bSz)
+    # NaN never wins argmin/argmax, unless the whole bin is NaN
+    isBad = np.isnan(yb)
+    iMin = np.where(isBad, np.inf, yb).argmin(axis=1)
+    iMax = np.where(isBad, -np.inf, yb).argmax(axis=1)
+    I = np.sort(np.stack((iMin, iMax), axis=1), axis=1)
+    I = (I + bSz*np.arange(nBin)[:, None]).ravel()
+    # Keep the leftover tail so the series ends at the same time
+    I = np.concatenate((I, np.arange(nBin*bSz, N)))
+    return t[I], y[I]
+
+
+def axPixWidth(Ax, dpiQ=300):
+    """
+    Width in pixels of the given axes when the figure is saved at dpiQ.
+
+    Parameters:
+        Ax (matplotlib.axes.Axes): The axes object.
+        dpiQ (int, optional): The output resolution. Defaults to savePic's 300.
+
+    Returns:
+        int: The axes width in pixels.
+    """
+    return int(np.ceil(Ax.get_position().width*Ax.figure.get_figwidth()*dpiQ))
+
+
+def plotSeries(Ax, t, *ys):
+    """
+    Plot one or more time series sharing the times t, decimating them first if they have far more points than pixels.
+
+    Short series are drawn with a single plot call on the stacked columns, in order
+    (same colors as one call per series).
+
+    Parameters:
+        Ax (matplotlib.axes.Axes): The axes object to plot on.
+        t (numpy.ndarray): The sample times.
+        *ys (numpy.ndarray): The sample values of each series.
+
+    Returns:
+        list: The lines added to Ax.
+    """
+    nPx = axPixWidth(Ax)
+    if len(t) <= 4*nPx:
+        return Ax.plot(t, np.column_stack(ys))
+    # Each series keeps its own extremes, so they are decimated (and drawn) separately
+    lines = []
+    for y in ys:
+        lines += Ax.plot(*decimateMinMax(t, y, 2*nPx))
+    return lines
+
+
+def inDomain(V, inDom, vecComp=-1):
+    """
+    Get the values of V inside the model domain, with NaN outside.
+
+    V is viewed as a plain ndarray first, slicing a spacepy dmarray deep-copies its attrs.
+
+    Parameters:
+        V (numpy.ndarray): The values, optionally with vector components in the second dimension.
+        inDom (numpy.ndarray): Boolean mask of points inside the domain.
+        vecComp (int, optional): The vector component to take. Defaults to -1 (scalar).
+
+    Returns:
+        numpy.ndarray: The masked values.
+    """
+    V = np.asarray(V)
+    if vecComp > -1:
+        V = V[:, vecComp]
+    return np.where(inDom, V, np.nan)
+
+
 def labelStr(data, key, vecComp):
     """
     Generate a label string based on the given data, key, and vector component.
@@ -499,19 +785,18 @@ def labelStr(data, key, vecComp):
     vecLabel = ['x', 'y', 'z']
     if key == "Velocity":
         key = "Speed"
+    attrs = data['GAMERA_' + key].attrs
+    units = attrs['UNITS']
+    if isinstance(units, bytes):
+        units = units.decode()
     if vecComp < 3 and vecComp > -1:
-        label = (
-            data['GAMERA_' + key].attrs['AXISLABEL'] +
-            vecLabel[vecComp] + ' [' +
-            data['GAMERA_' + key].attrs['UNITS'].decode() + ']'
-        )
+        label = attrs['AXISLABEL'] + vecLabel[vecComp] + ' [' + units + ']'
     else:
-        key_name = "GAMERA_" + key
-        label = data[key_name].attrs['AXISLABEL'] + ' [' + data[key_name].attrs['UNITS'].decode() + ']'
+        label = attrs['AXISLABEL'] + ' [' + units + ']'
     return label
 
 
-def itemPlot(Ax, data, key, plotNum, numPlots, vecComp=-1):
+def itemPlot(Ax, data, key, plotNum, numPlots, vecComp=-1, inDom=None, epoch=None, label=None):
     """
     Plot the data for a specific item.
 
@@ -522,10 +807,19 @@ def itemPlot(Ax, data, key, plotNum, numPlots, vecComp=-1):
         plotNum (int): The plot number.
         numPlots (int): The total number of plots.
         vecComp (int, optional): The vector component to plot. Defaults to -1.
+        inDom (numpy.ndarray, optional): Boolean mask of points inside the GAMERA domain.
+            Computed from data["GAMERA_inDom"] if not provided.
+        epoch (numpy.ndarray, optional): Times to plot against. Read from data['Epoch_bin'] if not provided.
+        label (str, optional): The y-axis label. Built with labelStr if not provided.
 
     Returns:
         None
     """
+    # Points outside the domain are set to NaN, which matplotlib skips when drawing lines
+    if inDom is None:
+        inDom = (data["GAMERA_inDom"][:] != 0.0)
+    if epoch is None:
+        epoch = np.asarray(data['Epoch_bin'][...])
     if -1 == vecComp:
         # if key == "Br":
         #     # Plot a horizontal line at Br=0. This indicates passage of the
@@ -537,34 +831,22 @@ def itemPlot(Ax, data, key, plotNum, numPlots, vecComp=-1):
         #     Ax.set_ylim(0, 50)  # cm**-3
         # </HACK>
         if key == "Velocity":
-            maskedData = np.ma.masked_where(
-                data["GAMERA_inDom"][:] == 0.0,
-                data[key].flatten()[0]["VR"][:]
-            )
-            maskedGamera = np.ma.masked_where(
-                data["GAMERA_inDom"][:] == 0.0, data['GAMERA_Speed'][:]
-            )
+            maskedData = inDomain(data[key].flatten()[0]["VR"], inDom)
+            maskedGamera = inDomain(data['GAMERA_Speed'], inDom)
         else:
-            maskedData = np.ma.masked_where(
-                data["GAMERA_inDom"][:] == 0.0, data[key][:]
-            )
-            maskedGamera = np.ma.masked_where(
-                data["GAMERA_inDom"][:] == 0.0, data['GAMERA_' + key][:]
-            )
-        Ax.plot(data['Epoch_bin'], maskedData)
-        Ax.plot(data['Epoch_bin'], maskedGamera)
+            maskedData = inDomain(data[key], inDom)
+            maskedGamera = inDomain(data['GAMERA_' + key], inDom)
+        plotSeries(Ax, epoch, maskedData, maskedGamera)
     else:
-        maskedData = np.ma.masked_where(data["GAMERA_inDom"][:] == 0.0,
-                                        data[key][:, vecComp])
-        Ax.plot(data['Epoch_bin'], maskedData)
-        maskedGamera = np.ma.masked_where(data["GAMERA_inDom"][:] == 0.0,
-                                          data['GAMERA_' + key][:, vecComp])
-        Ax.plot(data['Epoch_bin'], maskedGamera)
+        maskedData = inDomain(data[key], inDom, vecComp)
+        maskedGamera = inDomain(data['GAMERA_' + key], inDom, vecComp)
+        plotSeries(Ax, epoch, maskedData, maskedGamera)
     if (plotNum % 2) == 0:
         left = True
     else:
         left = False
-    label = labelStr(data, key, vecComp)
+    if label is None:
+        label = labelStr(data, key, vecComp)
     if plotNum == (numPlots - 1):
         SetAxLabs(Ax, 'UT', label, doLeft=left)
         SetAxDate(Ax)
@@ -573,7 +855,43 @@ def itemPlot(Ax, data, key, plotNum, numPlots, vecComp=-1):
     return
 
 
-def compPlot(plotname, scId, data):
+def getFig(figsize, layout=None, fig=None):
+    """
+    Get an empty figure of the given size, a new one unless a figure to reuse is passed in.
+
+    Batch scripts call the plotting routines once per spacecraft/file, passing the same figure
+    every time skips rebuilding the canvas. The caller owns that figure and closes it when done.
+
+    Parameters:
+        figsize (tuple): The figure size in inches.
+        layout (str, optional): The layout engine, e.g. "constrained". Defaults to None (rcParams default).
+        fig (matplotlib.figure.Figure, optional): A figure to clear and reuse. Defaults to None (new figure).
+
+    Returns:
+        matplotlib.figure.Figure: The empty figure.
+    """
+    plt = _pyplot()
+    if fig is None:
+        fig = plt.figure(figsize=figsize)
+    else:
+        fig.clear()
+        fig.set_size_inches(figsize)
+    # clear() keeps the subplot spacing, reset it to the defaults
+    fig.subplotpars.update(**{k: mpl.rcParams['figure.subplot.' + k]
+                              for k in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')})
+    # Set every call, the layout from a previous user of this figure must not carry over
+    if hasattr(fig, 'set_layout_engine'):
+        fig.set_layout_engine(layout)
+    else:
+        # Matplotlib < 3.6
+        fig.set_constrained_layout(layout == 'constrained')
+    return fig
+
+
+#Variables compPlot knows about and their number of components, in plotting order
+compPlotSpec = [('Density', 1), ('Pressure', 1), ('Temperature', 1), ('MagneticField', 3), ('Velocity', 3)]
+
+def compPlot(plotname, scId, data, fig=None):
     """
     Generate a composite plot with multiple subplots based on the given data.
 
@@ -581,80 +899,130 @@ def compPlot(plotname, scId, data):
         plotname (str): The title of the composite plot.
         scId (str): The identifier for the subplot legend.
         data (dict): A dictionary containing the data to be plotted.
+        fig (matplotlib.figure.Figure, optional): A figure to reuse, left open after saving.
+            Defaults to None (a new figure, closed after saving).
 
     Returns:
         Image file saved to disk.
 
     """
-    numPlots = 0
-    variables_to_plot = []
+    # Variables to plot and their number of components, in plotting order
     keys = data.keys()
+    to_plot = [(key, nComp) for key, nComp in compPlotSpec if key in keys]
+    numPlots = sum(nComp for _, nComp in to_plot)
 
-    if 'Density' in keys:
-        numPlots += 1
-        variables_to_plot.append('Density')
-    if 'Pressue' in keys:
-        numPlots += 1
-        variables_to_plot.append('Pressue')
-    if 'Temperature' in keys:
-        numPlots += 1
-        variables_to_plot.append('Temperature')
-    if 'MagneticField' in keys:
-        numPlots += 3
-        variables_to_plot.append('MagneticField')
-    if 'Velocity' in keys:
-        numPlots += 3
-        variables_to_plot.append('Velocity')
+    # Domain mask and times are read once and shared by every subplot
+    inDom = (np.asarray(data["GAMERA_inDom"][...]) != 0.0)
+    epoch = np.asarray(data['Epoch_bin'][...])
 
     figsize = (10, 10)
-    fig = plt.figure(figsize=figsize)
-    gs = fig.add_gridspec(numPlots, 1)
+    reuse = fig is not None
+    fig = getFig(figsize, fig=fig)
+    axes = fig.subplots(numPlots, 1, sharex=True, squeeze=False)[:, 0]
     plotNum = 0
 
-    for key in variables_to_plot:
-        if 'MagneticField' == key or 'Velocity' == key:
-            doVecPlot = True
-        else:
-            doVecPlot = False
-
-        if 0 == plotNum:
-            Ax1 = fig.add_subplot(gs[plotNum, 0])
-            if doVecPlot:
-                itemPlot(Ax1, data, key, plotNum, numPlots, vecComp=0)
-                plotNum += 1
-                Ax = fig.add_subplot(gs[plotNum, 0], sharex=Ax1)
-                itemPlot(Ax, data, key, plotNum, numPlots, vecComp=1)
-                plotNum += 1
-                Ax = fig.add_subplot(gs[plotNum, 0], sharex=Ax1)
-                itemPlot(Ax, data, key, plotNum, numPlots, vecComp=2)
-                plotNum += 1
-            else:
-                itemPlot(Ax1, data, key, plotNum, numPlots)
-                plotNum += 1
-        else:
-            Ax = fig.add_subplot(gs[plotNum, 0], sharex=Ax1)
-            if doVecPlot:
-                itemPlot(Ax, data, key, plotNum, numPlots, vecComp=0)
-                plotNum += 1
-                Ax = fig.add_subplot(gs[plotNum, 0], sharex=Ax1)
-                itemPlot(Ax, data, key, plotNum, numPlots, vecComp=1)
-                plotNum += 1
-                Ax = fig.add_subplot(gs[plotNum, 0], sharex=Ax1)
-                itemPlot(Ax, data, key, plotNum, numPlots, vecComp=2)
-                plotNum += 1
-            else:
-                itemPlot(Ax, data, key, plotNum, numPlots)
-                plotNum += 1
+    for key, nComp in to_plot:
+        vecComps = [0, 1, 2] if nComp == 3 else [-1]
+        for vecComp in vecComps:
+            label = labelStr(data, key, vecComp)
+            itemPlot(axes[plotNum], data, key, plotNum, numPlots, vecComp=vecComp,
+                     inDom=inDom, epoch=epoch, label=label)
+            plotNum += 1
 
+    Ax1 = axes[0]
     Ax1.legend([scId, 'GAMERA'], loc='best')
     Ax1.set_title(plotname)
-    plt.subplots_adjust(hspace=0)
+    fig.subplots_adjust(hspace=0)
 
-    savePic(plotname, doClose=True)
+    savePic(plotname, saveFigure=fig, doClose=not reuse)
 
 
     
-def trajPlot(plotname, scId, data, toRe):
+#Time format of the plot titles
+TITLE_TIME_FMT = "%m/%d/%Y - %H:%M:%S"
+
+def timeRangeStr(t0, t1, fmt=TITLE_TIME_FMT):
+    """
+    Format a time range for plot titles.
+
+    Parameters:
+        t0 (datetime.datetime or numpy.datetime64): The start time.
+        t1 (datetime.datetime or numpy.datetime64): The end time.
+        fmt (str, optional): The strftime format. Defaults to TITLE_TIME_FMT.
+
+    Returns:
+        str: The string "<t0> to <t1>".
+    """
+    if fmt == TITLE_TIME_FMT and isinstance(t0, np.datetime64) and isinstance(t1, np.datetime64):
+        # Rearrange numpy's ISO strings, no datetime objects needed
+        s0, s1 = np.datetime_as_string(np.array([t0, t1]), unit='s')
+        return (f"{s0[5:7]}/{s0[8:10]}/{s0[:4]} - {s0[11:19]} to "
+                f"{s1[5:7]}/{s1[8:10]}/{s1[:4]} - {s1[11:19]}")
+    t0, t1 = [t.astype('datetime64[us]').item() if isinstance(t, np.datetime64) else t for t in (t0, t1)]
+    return f"{t0:{fmt}} to {t1:{fmt}}"
+
+
+def plotTrack(Ax, X, Y):
+    """
+    Draw a trajectory as a single-segment LineCollection, lighter than a full Line2D.
+
+    The track is rasterized so long tracks don't become huge paths in vector output (no-op for PNG).
+
+    Parameters:
+        Ax (matplotlib.axes.Axes): The axes object to plot on.
+        X (numpy.ndarray): The x coordinates.
+        Y (numpy.ndarray): The y coordinates.
+
+    Returns:
+        matplotlib.collections.LineCollection: The added collection.
+
+    Note:
+        The data limits are updated from the finite range of the track instead of its path, and
+        autoscaling stays on so artists added later still extend the view.
+    """
+    lc = LineCollection([np.column_stack((X, Y))], colors='C0',
+                        linewidths=mpl.rcParams['lines.linewidth'], rasterized=True)
+    Ax.add_collection(lc, autolim=False)
+    fin = np.isfinite(X) & np.isfinite(Y)
+    if fin.any():
+        Ax.update_datalim([(X[fin].min(), Y[fin].min()), (X[fin].max(), Y[fin].max())])
+    Ax.autoscale_view()
+    return lc
+
+
+#Most points drawn per trajectory panel
+TRAJ_MAX_POINTS = 4000
+
+def trajStride(N, nMax=TRAJ_MAX_POINTS):
+    """
+    Get the stride that thins a trajectory of N points to at most about nMax points.
+
+    Parameters:
+        N (int): The number of points.
+        nMax (int, optional): The target number of points. Defaults to TRAJ_MAX_POINTS.
+
+    Returns:
+        int: The stride, at least 1.
+    """
+    return max(1, N//nMax)
+
+def trajIndex(N, nMax=TRAJ_MAX_POINTS):
+    """
+    Get the indices of the points kept when thinning a trajectory of N points with trajStride.
+
+    Parameters:
+        N (int): The number of points.
+        nMax (int, optional): The target number of points. Defaults to TRAJ_MAX_POINTS.
+
+    Returns:
+        numpy.ndarray: Every trajStride(N)-th index, always ending with the last point N-1.
+    """
+    if N == 0:
+        return np.arange(0)
+    return np.unique(np.r_[0:N:trajStride(N, nMax), N-1])
+
+
+def trajPlot(plotname, scId, data, toRe, fig=None):
     """
     Plot the trajectory of a spacecraft.
 
@@ -663,28 +1031,33 @@ def trajPlot(plotname, scId, data, toRe):
         scId (str): The spacecraft ID.
         data (dict): A dictionary containing the spacecraft's ephemeris data.
         toRe (float): The conversion factor from meters to Re (Earth radii).
+        fig (matplotlib.figure.Figure, optional): A figure to reuse, left open after saving.
+            Defaults to None (a new figure, closed after saving).
 
     Returns:
         Image file saved to disk.
     """
     figsize = (15, 5)
     # Create the figure in-memory.
-    mpl.use("AGG")
-    fig = plt.figure(figsize=figsize)
-    gs = fig.add_gridspec(1, 3)
-    Ax1 = fig.add_subplot(gs[0, 0])
-    Ax2 = fig.add_subplot(gs[0, 1])
-    Ax3 = fig.add_subplot(gs[0, 2])
-    Ax1.plot(data['Ephemeris'][:, 0] * toRe, data['Ephemeris'][:, 1] * toRe)
-    Ax2.plot(data['Ephemeris'][:, 0] * toRe, data['Ephemeris'][:, 2] * toRe)
-    Ax3.plot(data['Ephemeris'][:, 1] * toRe, data['Ephemeris'][:, 2] * toRe)
+    reuse = fig is not None
+    fig = getFig(figsize, fig=fig)
+    Ax1, Ax2, Ax3 = fig.subplots(1, 3)
+    # Read and scale the ephemeris once, then plot its columns
+    eph = np.asarray(data['Ephemeris'][...], dtype=np.float64)
+    eph *= toRe
+    # Ephemeris is smooth, thin long orbits before drawing
+    idx = trajIndex(len(eph))
+    X, Y, Z = eph[idx, 0], eph[idx, 1], eph[idx, 2]
+    plotTrack(Ax1, X, Y)
+    plotTrack(Ax2, X, Z)
+    plotTrack(Ax3, Y, Z)
     Ax1.set_title('XY SM')
     Ax2.set_title('XZ SM')
     Ax3.set_title('YZ SM')
-    titlestr = (scId + ' - ' + data['Epoch_bin'][0].strftime('%m/%d/%Y - %H:%M:%S') + ' to ' +
-                data['Epoch_bin'][-1].strftime('%m/%d/%Y - %H:%M:%S'))
+    epoch = data['Epoch_bin']
+    titlestr = scId + ' - ' + timeRangeStr(epoch[0], epoch[-1])
     fig.suptitle(titlestr)
-    savePic(plotname, doClose=True)
+    savePic(plotname, saveFigure=fig, doClose=not reuse)
 
 
 def get_aspect(ax):
@@ -761,7 +1134,7 @@ def helio_labelStr(data, key, vecComp):
     return label
 
 
-def helioItemPlot_new(Ax, sc_id, data, key, plotNum, numPlots, show_zero=False):
+def helioItemPlot_new(Ax, sc_id, data, key, plotNum, numPlots, show_zero=False, inDom=None, t=None, label=None):
     """Plot a single variable for the comparison plot.
 
     Plot a single variable for the comparison plot.
@@ -773,24 +1146,25 @@ def helioItemPlot_new(Ax, sc_id, data, key, plotNum, numPlots, show_zero=False):
         plotNum (int): Position of plot in sequence of plots.
         numPlots (int): Number of plots in sequence.
         show_zero (bool, default False): Set to True to show a black dashed line at the 0 level for the variable.
+        inDom (numpy.ndarray, optional): Boolean mask of points inside the gamhelio domain. Computed from data["GAMHELIO_inDom"] if not provided.
+        t (numpy.ndarray, optional): Times to plot against. Read from data["Ephemeris_time"] if not provided.
+        label (str, optional): The y-axis label. Built with helio_labelStr if not provided.
 
     Returns:
         None
     """
-    # Extract the times and values which fall within the gamhelio simulation
-    # domain.
-    t = np.ma.masked_where(
-        data["GAMHELIO_inDom"][:] == 0.0, data["Ephemeris_time"][:]
-    )
+    # Extract the values which fall within the gamhelio simulation domain.
+    # Points outside the domain are set to NaN, which matplotlib skips (along
+    # with their times) when drawing lines.
+    if inDom is None:
+        inDom = (np.asarray(data["GAMHELIO_inDom"][...]) != 0.0)
+    if t is None:
+        t = np.asarray(data["Ephemeris_time"][...])
     observed = None
     if key in data:
-        observed = np.ma.masked_where(
-            data["GAMHELIO_inDom"][:] == 0.0, data[key][:]
-        )
+        observed = inDomain(data[key], inDom)
     # gamhelio results should always be available.
-    predicted = np.ma.masked_where(
-        data["GAMHELIO_inDom"][:] == 0.0, data["GAMHELIO_" + key][:]
-    )
+    predicted = inDomain(data["GAMHELIO_" + key], inDom)
 
     # Show a black dotted line at y = 0 if requested.
     if show_zero:
@@ -799,7 +1173,7 @@ def helioItemPlot_new(Ax, sc_id, data, key, plotNum, numPlots, show_zero=False):
     # Plot the observed and predicted data for the current variable.
     # if key in data:
     if observed is not None:
-        Ax.plot(t, observed)
+        plotSeries(Ax, t, observed, predicted)
     else:
         fontsize = 18
         Ax.plot(t, [None]*len(t))
@@ -808,7 +1182,7 @@ def helioItemPlot_new(Ax, sc_id, data, key, plotNum, numPlots, show_zero=False):
             transform=Ax.transAxes,
             ha="center", va="center", fontsize=fontsize, color="darkgrey"
         )
-    Ax.plot(t, predicted)
+        plotSeries(Ax, t, predicted)
 
     # Even-numbered plots (1-based) show the y-axis label on the left.
     left = False
@@ -816,7 +1190,8 @@ def helioItemPlot_new(Ax, sc_id, data, key, plotNum, numPlots, show_zero=False):
         left = True
 
     # Compute the y-axis label string.
-    label = helio_labelStr(data, key, vecComp=-1)
+    if label is None:
+        label = helio_labelStr(data, key, vecComp=-1)
 
     # Show the x-axis on the last plot.
     if plotNum == numPlots:
@@ -830,7 +1205,7 @@ def helioItemPlot_new(Ax, sc_id, data, key, plotNum, numPlots, show_zero=False):
         Ax.legend([sc_id, "GAMHELIO"], loc="best")
 
 
-def helioCompPlot_new(plot_file_path, sc_id, sc_data):
+def helioCompPlot_new(plot_file_path, sc_id, sc_data, fig=None):
     """Create comparison plots for heliospheric results.
 
     Create comparison plots for heliospheric results and save the plots to a
@@ -846,6 +1221,9 @@ def helioCompPlot_new(plot_file_path, sc_id, sc_data):
         ID string for spacecraft.
     data : spacepy.datamodel.SpaceData
         The current spacecraft and model data
+    fig : matplotlib.figure.Figure, optional
+        Figure to reuse, left open after saving. By default a new figure is
+        created and closed after saving.
 
     Returns
     -------
@@ -857,12 +1235,17 @@ def helioCompPlot_new(plot_file_path, sc_id, sc_data):
     # Compute the number of variables to plot.
     n_plots = len(variables_to_plot)
 
-    # Create the figure in memory.
-    mpl.use("AGG")
+    # Read the domain mask and times once for all subplots.
+    inDom = (np.asarray(sc_data["GAMHELIO_inDom"][...]) != 0.0)
+    t = np.asarray(sc_data["Ephemeris_time"][...])
+
+    # Build the y-axis labels up front.
+    labels = {v: helio_labelStr(sc_data, v, vecComp=-1) for v in variables_to_plot}
 
     # Create the figure.
     HELIO_COMP_PLOT_FIGSIZE = (10, 10)
-    fig = plt.figure(figsize=HELIO_COMP_PLOT_FIGSIZE)
+    reuse = fig is not None
+    fig = getFig(HELIO_COMP_PLOT_FIGSIZE, fig=fig)
 
     # Plot each variable in its own subplot.
     for i in range(n_plots):
@@ -871,23 +1254,44 @@ def helioCompPlot_new(plot_file_path, sc_id, sc_data):
         show_zero = False
         if variable_name == "Br":
             show_zero = True
-        ax = plt.subplot(n_plots, 1, plotNum)
+        ax = fig.add_subplot(n_plots, 1, plotNum)
         helioItemPlot_new(
             ax, sc_id, sc_data, variable_name,
-            plotNum, n_plots, show_zero=show_zero
+            plotNum, n_plots, show_zero=show_zero, inDom=inDom, t=t,
+            label=labels[variable_name]
         )
 
     # Use the plot file path as the figure title.
     fig.suptitle(plot_file_path)
 
     # Stack the plots directly on top of each other.
-    plt.subplots_adjust(hspace=0)
+    fig.subplots_adjust(hspace=0)
 
     # Save the figure.
-    savePic(plot_file_path, doClose=True)
-
-
-def helioTrajPlot(plot_file_path, sc_id, sc_data):
+    savePic(plot_file_path, saveFigure=fig, doClose=not reuse)
+
+
+#Panels of helioTrajPlot for each spacecraft, as ((x key, column), (y key, column), x label, y label)
+#Column is None for 1D variables
+HELIO_TRAJ_SPECS = {
+    "ACE": [
+        (("Ephemeris", 0), ("Ephemeris", 1), "GSE X (km)", "GSE Y (km)"),
+        (("Ephemeris", 0), ("Ephemeris", 2), "GSE X (km)", "GSE Z (km)"),
+        (("Ephemeris", 1), ("Ephemeris", 2), "GSE Y (km)", "GSE Z (km)"),
+    ],
+    # "Parker_Solar_Probe": [
+    #     (("heliographicLongitude", None), ("radialDistance", None), "HGI longitude (deg)", "HGI radius ($R_{sun}$)"),
+    #     (("heliographicLatitude", None), ("radialDistance", None), "HGI latitude (deg)", "HGI radius ($R_{sun}$)"),
+    #     (("heliographicLongitude", None), ("heliographicLatitude", None), "HGI longitude (deg)", "HGI latitude (deg)"),
+    # ],
+    # "STEREO_A": [
+    #     (("HGI_LON", None), ("RAD_AU", None), "HGI longitude (deg)", "HGI radius ($R_{sun}$)"),
+    #     (("HGI_LAT", None), ("RAD_AU", None), "HGI latitude (deg)", "HGI radius ($R_{sun}$)"),
+    #     (("HGI_LON", None), ("HGI_LAT", None), "HGI longitude (deg)", "HGI latitude (deg)"),
+    # ],
+}
+
+def helioTrajPlot(plot_file_path, sc_id, sc_data, fig=None):
     """Create a set of trajectory plots for a heliospheric spacecraft.
 
     Create a set of trajectory plots for a heliospheric spacecraft.
@@ -901,70 +1305,57 @@ def helioTrajPlot(plot_file_path, sc_id, sc_data):
         Name of spacecraft.
     data: spacepy.datamodel.SpaceData
         Object containing spacecraft data.
+    fig: matplotlib.figure.Figure, optional
+        Figure to reuse, left open after saving. By default a new figure is
+        created and closed after saving.
 
     Returns
     -------
     None
     """
+    # Check the spacecraft before building anything.
+    specs = HELIO_TRAJ_SPECS.get(sc_id)
+    if specs is None:
+        raise TypeError(f"Unknown spacecraft {sc_id}")
+
     # Set the figure size (inches)
     figsize = (15, 5)
 
-    # Create the figure in-memory.
-    mpl.use("AGG")
-    fig = plt.figure(figsize=figsize)
+    # Create the figure in-memory, constrained layout makes room for the
+    # axis labels and the title in one pass.
+    reuse = fig is not None
+    fig = getFig(figsize, layout='constrained', fig=fig)
 
-    # Create a grid for the sin-plots.
-    gs = fig.add_gridspec(1, 3)
-    ax1 = fig.add_subplot(gs[0, 0])
-    ax2 = fig.add_subplot(gs[0, 1])
-    ax3 = fig.add_subplot(gs[0, 2])
+    # Create the sub-plots.
+    ax1, ax2, ax3 = fig.subplots(1, 3)
 
     # Plot the components against each other.
-    if sc_id == "ACE":
-        X = sc_data["Ephemeris"][:, 0]
-        Y = sc_data["Ephemeris"][:, 1]
-        Z = sc_data["Ephemeris"][:, 2]
-        ax1.plot(X, Y)
-        ax1.set_xlabel("GSE X (km)")
-        ax1.set_ylabel("GSE Y (km)")
-        ax2.plot(X, Z)
-        ax2.set_xlabel("GSE X (km)")
-        ax2.set_ylabel("GSE Z (km)")
-        ax3.plot(Y, Z)
-        ax3.set_xlabel("GSE Y (km)")
-        ax3.set_ylabel("GSE Z (km)")
-        fig.subplots_adjust(wspace=0.25)
-    # elif sc_id == "Parker_Solar_Probe":
-    #     ax1.plot(sc_data["heliographicLongitude"][:], sc_data["radialDistance"][:])
-    #     ax1.set_xlabel("HGI longitude (deg)")
-    #     ax1.set_ylabel("HGI radius ($R_{sun})$")
-    #     ax2.plot(sc_data["heliographicLatitude"][:], sc_data["radialDistance"][:])
-    #     ax2.set_xlabel("HGI latitude (deg)")
-    #     ax2.set_ylabel("HGI radius ($R_{sun})$")
-    #     ax3.plot(sc_data["heliographicLongitude"][:], sc_data["heliographicLatitude"][:])
-    #     ax3.set_xlabel("HGI longitude (deg)")
-    #     ax3.set_ylabel("HGI latitude (deg)$")
-    # elif sc_id == "STEREO_A":
-    #     ax1.plot(sc_data["HGI_LON"][:], sc_data["RAD_AU"][:])
-    #     ax1.set_xlabel("HGI longitude (deg)")
-    #     ax1.set_ylabel("HGI radius ($R_{sun})$")
-    #     ax2.plot(sc_data["HGI_LAT"][:], sc_data["RAD_AU"][:])
-    #     ax2.set_xlabel("HGI latitude (deg)")
-    #     ax2.set_ylabel("HGI radius ($R_{sun})$")
-    #     ax3.plot(sc_data["HGI_LON"][:], sc_data["HGI_LAT"][:])
-    #     ax3.set_xlabel("HGI longitude (deg)")
-    #     ax3.set_ylabel("HGI latitude (deg)$")
-    else:
-        raise TypeError
-
-    # Apply the overall title.
-    title = (
-        sc_id + " - " +
-        sc_data["Ephemeris_Epoch"][0].strftime("%m/%d/%Y - %H:%M:%S") +
-        " to " +
-        sc_data["Ephemeris_Epoch"][-1].strftime("%m/%d/%Y - %H:%M:%S")
-    )
-    fig.suptitle(title)
+    # Each variable is read once, panels share it
+    cols = {}
+    for key in {k for spec in specs for k, _ in spec[:2]}:
+        cols[key] = np.asarray(sc_data[key][...])
+    # Panels plotting the same variable on the same axis share it (one set of tick computations)
+    xAxes, yAxes = {}, {}
+    for ax, ((xKey, xCol), (yKey, yCol), xLabel, yLabel) in zip((ax1, ax2, ax3), specs):
+        if (xKey, xCol) in xAxes:
+            ax.sharex(xAxes[xKey, xCol])
+        else:
+            xAxes[xKey, xCol] = ax
+        if (yKey, yCol) in yAxes:
+            ax.sharey(yAxes[yKey, yCol])
+        else:
+            yAxes[yKey, yCol] = ax
+        X = cols[xKey] if xCol is None else cols[xKey][:, xCol]
+        Y = cols[yKey] if yCol is None else cols[yKey][:, yCol]
+        idx = trajIndex(len(X))
+        plotTrack(ax, X[idx], Y[idx])
+        ax.set(xlabel=xLabel, ylabel=yLabel)
+
+    # Apply the overall title, on the center panel so only its axes need room above.
+    epoch = sc_data["Ephemeris_Epoch"]
+    t0, t1 = epoch[0], epoch[-1]
+    title = f"{sc_id} - {timeRangeStr(t0, t1)}"
+    ax2.set_title(title, pad=14)
 
     # Save the figure to a file.
-    savePic(plot_file_path, doClose=True)
+    savePic(plot_file_path, saveFigure=fig, doClose=not reuse)
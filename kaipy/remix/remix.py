@@ -7,6 +7,16 @@ import h5py
 import matplotlib.pyplot as plt
 import matplotlib.cm as cm
 import numpy as np
+# numba isn't a kaipy requirement, the Biot-Savart sums fall back to numpy broadcasting without it
+try:
+	import numba
+except ModuleNotFoundError:
+	numba = None
+# cupy is likewise optional, it is only used when dB is asked to run on the GPU
+try:
+	import cupy
+except ModuleNotFoundError:
+	cupy = None
 
 # Kaipy modules
 from kaipy.kdefs import RionE, REarth
@@ -20,6 +30,239 @@ facMax = 1.5
 facCM = cm.RdBu_r
 flxCM = cm.inferno
 
+# default data limits for plotting, copied into each remix instance
+defaultLimits = {
+	'potential': {'min': -100, 'max': 100},
+	'current': {'min': -facMax, 'max': facMax},
+	'sigmap': {'min': 1, 'max': 20},
+	'sigmah': {'min': 2, 'max': 40},
+	'energy': {'min': 0, 'max': 20},
+	'flux': {'min': 0, 'max': 1.e9},
+	'eflux': {'min': 0, 'max': 10.},
+	'efield': {'min': -1, 'max': 1},
+	'joule': {'min': 0, 'max': 10},
+	'jhall': {'min': -2, 'max': 2},
+	'gtype': {'min': 0, 'max': 1},
+	'npsp': {'min': 0, 'max': 1.e3},
+	'Menergy': {'min': 0, 'max': 20},
+	'Mflux': {'min': 0, 'max': 1.e10},
+	'Meflux': {'min': 0, 'max': 10.},
+	'Denergy': {'min': 0, 'max': 20},
+	'Dflux': {'min': 0, 'max': 1.e10},
+	'Deflux': {'min': 0, 'max': 10.},
+	'Penergy': {'min': 0, 'max': 240},
+	'Pflux': {'min': 0, 'max': 1.e7},
+	'Peflux': {'min': 0, 'max': 1.}
+}
+
+# HDF5 chunk cache used when reading remix files (default h5py cache is 1 MiB)
+rdccBytes = 64*1024*1024
+rdccSlots = 1048583  # prime, ~100x the number of chunks that fit in rdccBytes
+
+# target size in bytes of each (source,destination) float64 temporary in the Biot-Savart sums
+bsTileBytes = 32*1024*1024
+
+# source/destination block size of the numba Biot-Savart kernel (7 source arrays x 128 x 8B fits in L1)
+bsBlock = 128
+
+def _bsTile(nSrc):
+	"""
+	Return the number of destination points per Biot-Savart tile.
+
+	Args:
+		nSrc (int): The number of source points paired with each destination.
+
+	Returns:
+		int: The tile size, at least 1.
+	"""
+	return max(1, bsTileBytes // (8*nSrc))
+
+def _bsSheetSumXP(xp, xs, ys, zs, jx, jy, jz, dA, xd, yd, zd):
+	"""
+	Tiled array implementation of the Biot-Savart sheet sum, sum( j x R dA/|R|^3 ).
+
+	Args:
+		xp (module): The array module holding the arrays, numpy or cupy.
+		xs, ys, zs (array): Flat source cell coordinates.
+		jx, jy, jz (array): Flat Cartesian source currents.
+		dA (array): Flat source cell areas.
+		xd, yd, zd (array): Destination point coordinates.
+
+	Returns:
+		tuple: The x, y and z components of the sum at each destination point.
+	"""
+	nDest = xd.shape[0]
+	Ix = xp.zeros(nDest)
+	Iy = xp.zeros(nDest)
+	Iz = xp.zeros(nDest)
+
+	# with R = d - s, j x R = j x d - j x s, so only the weights w = dA/|R|^3 need the full
+	# (source,destination) shape; j x s and |s|^2 are per source, |d|^2 is per destination
+	# per-source columns j and j x s, contracted against w in one matmul per tile
+	J6 = xp.stack([jx, jy, jz, jy*zs - jz*ys, jz*xs - jx*zs, jx*ys - jy*xs], axis=1)
+	src = xp.stack([xs, ys, zs], axis=1)
+	dst = xp.stack([xd, yd, zd], axis=1)
+	s2 = (src*src).sum(axis=1)[:, None]
+	d2 = (dst*dst).sum(axis=1)
+	single = xs.dtype == xp.float32
+	if single:
+		# single precision weights are contracted in double precision
+		J6 = J6.astype(xp.float64)
+
+	# the (source,destination) arrays are built one tile of destinations at a time
+	tile = _bsTile(xs.shape[0])
+	for i0 in range(0, nDest, tile):
+		ds = slice(i0, i0 + tile)
+		if single:
+			# the |R|^2 expansion below cancels badly in single precision, form R = d - s directly
+			Rx = xd[None, ds] - xs[:, None]
+			Ry = yd[None, ds] - ys[:, None]
+			Rz = zd[None, ds] - zs[:, None]
+			R2 = Rx*Rx
+			R2 += Ry*Ry
+			R2 += Rz*Rz
+		else:
+			# |R|^2 = |s|^2 + |d|^2 - 2 s.d
+			R2 = src @ dst[ds].T
+			R2 *= -2.
+			R2 += s2
+			R2 += d2[None, ds]
+		# w = dA/(|R|^2 |R|), one sqrt and no pow
+		w = xp.sqrt(R2)
+		w *= R2
+		xp.divide(dA[:, None], w, out=w)
+		# all three components come from the same pass over w
+		Wjx, Wjy, Wjz, Wcx, Wcy, Wcz = (w.T @ J6).T
+		Ix[ds] = Wjy*zd[ds] - Wjz*yd[ds] - Wcx
+		Iy[ds] = Wjz*xd[ds] - Wjx*zd[ds] - Wcy
+		Iz[ds] = Wjx*yd[ds] - Wjy*xd[ds] - Wcz
+	return Ix, Iy, Iz
+
+if numba is not None:
+	@numba.njit(parallel=True, cache=True)
+	def _bsSheetSum(xs, ys, zs, jx, jy, jz, dA, xd, yd, zd):
+		"""
+		Biot-Savart sum of a current sheet over source cells, sum( j x R dA/|R|^3 ).
+
+		Args:
+			xs, ys, zs (numpy.ndarray): Flat source cell coordinates.
+			jx, jy, jz (numpy.ndarray): Flat Cartesian source currents.
+			dA (numpy.ndarray): Flat source cell areas.
+			xd, yd, zd (numpy.ndarray): Destination point coordinates.
+
+		Returns:
+			tuple: The x, y and z components of the sum at each destination point.
+		"""
+		nDest = xd.shape[0]
+		nSrc = xs.shape[0]
+		Ix = np.zeros(nDest)
+		Iy = np.zeros(nDest)
+		Iz = np.zeros(nDest)
+		# n-body style blocking: each thread owns a block of destinations and sweeps
+		# the sources a block at a time, so a source block stays in cache across its destinations
+		nBlk = (nDest + bsBlock - 1)//bsBlock
+		for b in numba.prange(nBlk):
+			d0 = b*bsBlock
+			d1 = min(d0 + bsBlock, nDest)
+			for s0 in range(0, nSrc, bsBlock):
+				s1 = min(s0 + bsBlock, nSrc)
+				for n in range(d0, d1):
+					bx = 0.
+					by = 0.
+					bz = 0.
+					for m in range(s0, s1):
+						Rx = xd[n] - xs[m]
+						Ry = yd[n] - ys[m]
+						Rz = zd[n] - zs[m]
+						R2 = Rx*Rx + Ry*Ry + Rz*Rz
+						w = dA[m]/(R2*np.sqrt(R2))
+						bx += (jy[m]*Rz - jz[m]*Ry)*w
+						by += (jz[m]*Rx - jx[m]*Rz)*w
+						bz += (jx[m]*Ry - jy[m]*Rx)*w
+					Ix[n] += bx
+					Iy[n] += by
+					Iz[n] += bz
+		return Ix, Iy, Iz
+else:
+	def _bsSheetSum(xs, ys, zs, jx, jy, jz, dA, xd, yd, zd):
+		"""
+		Biot-Savart sum of a current sheet over source cells, sum( j x R dA/|R|^3 ).
+
+		Args:
+			xs, ys, zs (numpy.ndarray): Flat source cell coordinates.
+			jx, jy, jz (numpy.ndarray): Flat Cartesian source currents.
+			dA (numpy.ndarray): Flat source cell areas.
+			xd, yd, zd (numpy.ndarray): Destination point coordinates.
+
+		Returns:
+			tuple: The x, y and z components of the sum at each destination point.
+		"""
+		return _bsSheetSumXP(np, xs, ys, zs, jx, jy, jz, dA, xd, yd, zd)
+
+def _bsSheetSumGPU(xs, ys, zs, jx, jy, jz, dA, xd, yd, zd):
+	"""
+	Biot-Savart sum of a current sheet on the GPU with cupy, same arguments and results as _bsSheetSum.
+	"""
+	args = [cupy.asarray(a) for a in (xs, ys, zs, jx, jy, jz, dA, xd, yd, zd)]
+	return tuple(cupy.asnumpy(I) for I in _bsSheetSumXP(cupy, *args))
+
+def _readDataset(ds):
+	"""
+	Read an HDF5 dataset straight into a preallocated numpy array.
+
+	Args:
+		ds (h5py.Dataset): The dataset to read.
+
+	Returns:
+		numpy.ndarray: The dataset contents.
+	"""
+	arr = np.empty(ds.shape, dtype=ds.dtype)
+	ds.read_direct(arr)
+	return arr
+
+def _cornerAvg(a):
+	"""
+	Average the four corners of each cell of a 2D array, 0.25*(a[i,j]+a[i+1,j]+a[i,j+1]+a[i+1,j+1]).
+
+	Args:
+		a (numpy.ndarray): Array of corner values of shape (M, N).
+
+	Returns:
+		numpy.ndarray: Array of cell averages of shape (M-1, N-1).
+	"""
+	avg = a[:-1,:-1] + a[1:,:-1]
+	avg += a[:-1,1:]
+	avg += a[1:,1:]
+	avg *= 0.25
+	return avg
+
+def _readOnly(*arrays):
+	"""
+	Mark cached arrays read-only, so callers handed the cached objects cannot modify later results.
+
+	Args:
+		*arrays (numpy.ndarray): The arrays to freeze.
+
+	Returns:
+		tuple: The same arrays, now not writeable.
+	"""
+	for a in arrays:
+		a.flags.writeable = False
+	return arrays
+
+def _fileOffset(ds):
+	"""
+	Return the byte offset of a contiguous dataset in its file, or -1 if it has none (chunked/compact).
+
+	Args:
+		ds (h5py.Dataset): The dataset.
+
+	Returns:
+		int: The byte offset.
+	"""
+	offset = ds.id.get_offset()
+	return -1 if offset is None else offset
+
 class remix:
 	"""
 	A class for handling and manipulating ion data in the REMIX format.
@@ -33,10 +276,10 @@ class remix:
 		Initialized (bool): Indicates whether the object has been initialized.
 
 	Methods:
-		__init__(self, h5file, step)
+		__init__(self, h5file, step, hemisphere=None)
 			Initializes the remix object and loads the ion data.
 
-		get_data(self, h5file, step)
+		get_data(self, h5file, step, hemisphere=None)
 			Loads the ion data from the REMIX file.
 	
 		init_vars(self, hemisphere)
@@ -45,9 +288,6 @@ class remix:
 		get_spherical(self, x, y)
 			Converts Cartesian coordinates to spherical coordinates.
 	
-		distance(self, p0, p1)
-			Calculates the Euclidean distance between two points in R^3.
-	
 		calcFaceAreas(self, x, y)
 			Calculates the area of each face in a quad mesh.
 	
@@ -76,13 +316,14 @@ class remix:
 		This class assumes that the REMIX file is in a specific format and follows certain naming conventions for the variables.
 	"""
 
-	def __init__(self, h5file, step):
+	def __init__(self, h5file, step, hemisphere=None):
 		"""
 		Initialize the Remix object.
 
 		Args:
 			h5file (str): The path to the H5 file.
 			step (int): The step number.
+			hemisphere (str, optional): Only load data for this hemisphere ('north' or 'south'). Default loads both.
 
 		Attributes:
 			ion (object): The ion object to store data and coordinates.
@@ -90,41 +331,36 @@ class remix:
 			variables (dict): Dictionary defining the data limits for different variables.
 		"""
 		# create the ion object to store data and coordinates
-		self.ion = self.get_data(h5file, step)
+		self.ion = self.get_data(h5file, step, hemisphere)
+		# the only hemisphere in self.ion, None if both were loaded
+		self._loadedHemisphere = None if hemisphere is None else hemisphere.upper()
 		self.Initialized = False
-
-		# define default data limits for plotting
-		self.variables = {
-			'potential': {'min': -100, 'max': 100},
-			'current': {'min': -facMax, 'max': facMax},
-			'sigmap': {'min': 1, 'max': 20},
-			'sigmah': {'min': 2, 'max': 40},
-			'energy': {'min': 0, 'max': 20},
-			'flux': {'min': 0, 'max': 1.e9},
-			'eflux': {'min': 0, 'max': 10.},
-			'efield': {'min': -1, 'max': 1},
-			'joule': {'min': 0, 'max': 10},
-			'jhall': {'min': -2, 'max': 2},
-			'gtype': {'min': 0, 'max': 1},
-			'npsp': {'min': 0, 'max': 1.e3},
-			'Menergy': {'min': 0, 'max': 20},
-			'Mflux': {'min': 0, 'max': 1.e10},
-			'Meflux': {'min': 0, 'max': 10.},
-			'Denergy': {'min': 0, 'max': 20},
-			'Dflux': {'min': 0, 'max': 1.e10},
-			'Deflux': {'min': 0, 'max': 10.},
-			'Penergy': {'min': 0, 'max': 240},
-			'Pflux': {'min': 0, 'max': 1.e7},
-			'Peflux': {'min': 0, 'max': 1.}
-		}
-
-	def get_data(self, h5file, step):
+		self._hemisphere = None
+		# unit-sphere face areas, computed on first use (the grid is fixed per file)
+		self._areaMixGrid = None
+		# cell-center contour coordinates, computed on first use
+		self._cornerCoordsCache = None
+		# Cartesian cell centers, computed on first use
+		self._cellCenterCache = None
+		# grid metrics shared by efield and hCurrents, computed on first use
+		self._geom = None
+		# flux-tube segment geometry used by dB, keyed by (Rinner, rsegments)
+		self._fluxTubeCache = {}
+
+		# default data limits for plotting, copied so per-instance 'data' entries don't leak
+		self.variables = {k: dict(v) for k, v in defaultLimits.items()}
+
+	def get_data(self, h5file, step, hemisphere=None):
 		"""
 		Retrieve data from an HDF5 file for a given step.
 
 		Parameters:
 			h5file (str): The path to the HDF5 file.
 			step (int): The step number.
+			hemisphere (str, optional): If given ('north' or 'south'), datasets of the other hemisphere are skipped.
+
+		Raises:
+			ValueError: If hemisphere is not 'north' or 'south'.
 
 		Returns:
 			dict: A dictionary containing the retrieved data.
@@ -133,17 +369,31 @@ class remix:
 				- Additional keys for each dataset in the specified step.
 				- 'R': The spherical coordinates (radius).
 				- 'THETA': The spherical coordinates (theta).
+				- 'THETA_POLAR': The polar angle, arcsin(R).
 		"""
 		ion = {}
 
-		with h5py.File(h5file, 'r') as f:
-			ion['X'] = f['X'][:]
-			ion['Y'] = f['Y'][:]
-			for h in f['Step#%d' % step].keys():
-				ion[h] = f['Step#%d' % step][h][:]
+		# suffix of the datasets to leave on disk
+		skip = None
+		if hemisphere is not None:
+			if hemisphere.upper() not in ('NORTH', 'SOUTH'):
+				raise ValueError("hemisphere must be 'north' or 'south', got %r" % (hemisphere,))
+			skip = ' SOUTH' if hemisphere.upper() == 'NORTH' else ' NORTH'
+
+		with h5py.File(h5file, 'r', rdcc_nbytes=rdccBytes, rdcc_nslots=rdccSlots, rdcc_w0=0.75) as f:
+			ion['X'] = _readDataset(f['X'])
+			ion['Y'] = _readDataset(f['Y'])
+			grp = f['Step#%d' % step]
+			dsets = [(h, grp[h]) for h in grp.keys() if skip is None or not h.endswith(skip)]
+			# h5py serializes reads behind a global lock, so rather than threading them
+			# read the datasets in the order they are laid out in the file
+			dsets.sort(key=lambda hd: _fileOffset(hd[1]))
+			for h, ds in dsets:
+				ion[h] = _readDataset(ds)
 
 		# Get spherical coords
 		ion['R'], ion['THETA'] = self.get_spherical(ion['X'], ion['Y'])
+		ion['THETA_POLAR'] = np.arcsin(ion['R'])
 
 		return ion
 
@@ -156,81 +406,82 @@ class remix:
 		Args:
 			hemisphere (str): The hemisphere ('north' or 'south').
 
+		Raises:
+			ValueError: If hemisphere is not 'north' or 'south', or its data wasn't loaded.
+
 		Returns:
 			None
 
 		"""
 		h = hemisphere.upper() # for shortness
+		if h not in ('NORTH', 'SOUTH'):
+			raise ValueError("hemisphere must be 'north' or 'south', got %r" % (hemisphere,))
+		if self._loadedHemisphere not in (None, h):
+			raise ValueError("Only the %s hemisphere was loaded (remix(..., hemisphere=%r)), can't initialize %s"
+				% (self._loadedHemisphere, self._loadedHemisphere.lower(), h))
 
-		# Initialize variables based on the hemisphere
+		# The south hemisphere is stored flipped in longitude, read it through a reversed view
 		if (h == 'NORTH'):
-			# Initialize variables for the 'north' hemisphere
-			self.variables['potential']['data'] = self.ion['Potential ' + h]
-			self.variables['current']['data'] = -self.ion['Field-aligned current ' + h]  # note, converting to common convention (upward=positive)
-			self.variables['sigmap']['data'] = self.ion['Pedersen conductance ' + h]
-			self.variables['sigmah']['data'] = self.ion['Hall conductance ' + h]
-			self.variables['energy']['data'] = self.ion['Average energy ' + h]
-			self.variables['flux']['data'] = self.ion['Number flux ' + h]
-			if 'RCM grid type ' + h in self.ion.keys():
-				self.variables['gtype']['data'] = self.ion['RCM grid type ' + h]
-			if 'RCM plasmasphere density ' + h in self.ion.keys():
-				self.variables['npsp']['data'] = self.ion['RCM plasmasphere density ' + h] * 1.0e-6  # /m^3 -> /cc.
-			if 'Zhang average energy ' + h in self.ion.keys():
-				self.variables['Menergy']['data'] = self.ion['Zhang average energy ' + h]
-				self.variables['Mflux']['data'] = self.ion['Zhang number flux ' + h]
-				self.variables['Meflux']['data'] = self.variables['Menergy']['data'] * self.variables['Mflux']['data'] * 1.6e-9
-			if 'IM average energy ' + h in self.ion.keys():
-				self.variables['Denergy']['data'] = self.ion['IM average energy ' + h]
-				self.variables['Deflux']['data'] = self.ion['IM Energy flux ' + h]
-				self.variables['Denergy']['data'][self.variables['Denergy']['data'] == 0] = 1.e-20
-				self.variables['Denergy']['data'][np.isnan(self.variables['Denergy']['data'])] = 1.e-20
-				self.variables['Dflux']['data'] = self.variables['Deflux']['data'] / self.variables['Denergy']['data'] / (1.6e-9)
-				self.variables['Dflux']['data'][self.variables['Denergy']['data'] == 1.e-20] = 0.
-			if 'IM average energy proton ' + h in self.ion.keys():
-				self.variables['Penergy']['data'] = self.ion['IM average energy proton ' + h]
-				self.variables['Peflux']['data'] = self.ion['IM Energy flux proton ' + h]
-				self.variables['Penergy']['data'][self.variables['Penergy']['data'] == 0] = 1.e-20
-				self.variables['Penergy']['data'][np.isnan(self.variables['Penergy']['data'])] = 1.e-20
-				self.variables['Pflux']['data'] = self.variables['Peflux']['data'] / self.variables['Penergy']['data'] / (1.6e-9)
-				self.variables['Pflux']['data'][self.variables['Penergy']['data'] == 1.e-20] = 0.
+			sl = np.s_[:, :]
 		else:
-			# Initialize variables for the 'south' hemisphere
-			self.variables['potential']['data'] = self.ion['Potential ' + h][:, ::-1]
-			self.variables['current']['data'] = self.ion['Field-aligned current ' + h][:, ::-1]
-			self.variables['sigmap']['data'] = self.ion['Pedersen conductance ' + h][:, ::-1]
-			self.variables['sigmah']['data'] = self.ion['Hall conductance ' + h][:, ::-1]
-			self.variables['energy']['data'] = self.ion['Average energy ' + h][:, ::-1]
-			self.variables['flux']['data'] = self.ion['Number flux ' + h][:, ::-1]
-			if 'RCM grid type ' + h in self.ion.keys():
-				self.variables['gtype']['data'] = self.ion['RCM grid type ' + h][:, ::-1]
-			if 'RCM plasmasphere density ' + h in self.ion.keys():
-				self.variables['npsp']['data'] = self.ion['RCM plasmasphere density ' + h][:, ::-1] * 1.0e-6  # /m^3 -> /cc.
-			if 'Zhang average energy ' + h in self.ion.keys():
-				self.variables['Menergy']['data'] = self.ion['Zhang average energy ' + h][:, ::-1]
-				self.variables['Mflux']['data'] = self.ion['Zhang number flux ' + h][:, ::-1]
-				self.variables['Meflux']['data'] = self.variables['Menergy']['data'] * self.variables['Mflux']['data'] * 1.6e-9
-			if 'IM average energy ' + h in self.ion.keys():
-				self.variables['Denergy']['data'] = self.ion['IM average energy ' + h][:, ::-1]
-				self.variables['Deflux']['data'] = self.ion['IM Energy flux ' + h][:, ::-1]
-				self.variables['Denergy']['data'][self.variables['Denergy']['data'] == 0] = 1.e-20
-				self.variables['Denergy']['data'][np.isnan(self.variables['Denergy']['data'])] = 1.e-20
-				self.variables['Dflux']['data'] = self.variables['Deflux']['data'] / self.variables['Denergy']['data'] / (1.6e-9)
-				self.variables['Dflux']['data'][self.variables['Denergy']['data'] == 1.e-20] = 0.
-			if 'IM average energy proton ' + h in self.ion.keys():
-				self.variables['Penergy']['data'] = self.ion['IM average energy proton ' + h][:, ::-1]
-				self.variables['Peflux']['data'] = self.ion['IM Energy flux proton ' + h][:, ::-1]
-				self.variables['Penergy']['data'][self.variables['Penergy']['data'] == 0] = 1.e-20
-				self.variables['Penergy']['data'][np.isnan(self.variables['Penergy']['data'])] = 1.e-20
-				self.variables['Pflux']['data'] = self.variables['Peflux']['data'] / self.variables['Penergy']['data'] / (1.6e-9)
-				self.variables['Pflux']['data'][self.variables['Penergy']['data'] == 1.e-20] = 0.
+			sl = np.s_[:, ::-1]
+
+		# Plotting and the power integrals don't need double precision, cast the variables to float32 once here
+		load = lambda name: self.ion[name + h][sl].astype(np.float32, copy=False)
+
+		self.variables['potential']['data'] = load('Potential ')
+		if (h == 'NORTH'):
+			self.variables['current']['data'] = -load('Field-aligned current ')  # note, converting to common convention (upward=positive)
+		else:
+			self.variables['current']['data'] = load('Field-aligned current ')
+		self.variables['sigmap']['data'] = load('Pedersen conductance ')
+		self.variables['sigmah']['data'] = load('Hall conductance ')
+		self.variables['energy']['data'] = load('Average energy ')
+		self.variables['flux']['data'] = load('Number flux ')
+		if 'RCM grid type ' + h in self.ion.keys():
+			self.variables['gtype']['data'] = load('RCM grid type ')
+		if 'RCM plasmasphere density ' + h in self.ion.keys():
+			self.variables['npsp']['data'] = load('RCM plasmasphere density ') * 1.0e-6  # /m^3 -> /cc.
+		if 'Zhang average energy ' + h in self.ion.keys():
+			self.variables['Menergy']['data'] = load('Zhang average energy ')
+			self.variables['Mflux']['data'] = load('Zhang number flux ')
+			self.variables['Meflux']['data'] = self.variables['Menergy']['data'] * self.variables['Mflux']['data'] * 1.6e-9
+		if 'IM average energy ' + h in self.ion.keys():
+			self.variables['Deflux']['data'] = load('IM Energy flux ')
+			self.variables['Denergy']['data'], self.variables['Dflux']['data'] = self._numberFlux(
+				load('IM average energy '), self.variables['Deflux']['data'])
+		if 'IM average energy proton ' + h in self.ion.keys():
+			self.variables['Peflux']['data'] = load('IM Energy flux proton ')
+			self.variables['Penergy']['data'], self.variables['Pflux']['data'] = self._numberFlux(
+				load('IM average energy proton '), self.variables['Peflux']['data'])
 
 		# convert energy flux to erg/cm2/s to conform to Newell++, doi:10.1029/2009JA014326, 2009
 		self.variables['eflux']['data'] = self.variables['energy']['data'] * self.variables['flux']['data'] * 1.6e-9
 		# Mask out Eavg where EnFlux<0.1
 		# self.variables['energy']['data'][self.variables['sigmap']['data']<=2.5]=0.0
+		self._hemisphere = h
 		self.Initialized = True
 	
 
+	def _numberFlux(self, energy, eflux):
+		"""
+		Compute the number flux from an average energy and an energy flux.
+
+		Cells where the energy is zero or NaN get an energy of 1.e-20 and a number flux of zero.
+
+		Args:
+			energy (numpy.ndarray): Average energy [keV].
+			eflux (numpy.ndarray): Energy flux [erg/cm^2s].
+
+		Returns:
+			tuple: The cleaned energy and the number flux [1/cm^2s].
+		"""
+		valid = ~(np.isnan(energy) | (energy == 0))
+		flux = np.zeros_like(eflux)
+		np.divide(eflux, energy * 1.6e-9, out=flux, where=valid)
+		energy = np.where(valid, energy, 1.e-20)
+		return energy, flux
+
 	def get_spherical(self, x, y):
 		"""
 		Convert Cartesian coordinates (x, y) to spherical coordinates (r, theta).
@@ -248,28 +499,13 @@ class remix:
 		# this is because the original grid is staggered at half-cells from data.
 		# empirically, this is OK for pcolormesh plots under remix.plot.
 		# but I still fix it manually.
-		theta = np.arctan2(y, x)
-		theta[theta < 0] = theta[theta < 0] + 2 * np.pi
+		theta = np.mod(np.arctan2(y, x), 2 * np.pi)
 		theta[:, 0] -= 2 * np.pi  # fixing the first theta point to just below 0
-		r = np.sqrt(x ** 2 + y ** 2)
+		r = np.hypot(x, y)
 
 		return r, theta
 	
 
-	def distance(self, p0, p1):
-		"""Calculate the Euclidean distance between two points in R^3.
-
-		Args:
-			p0 (tuple): The coordinates of the first point in R^3.
-			p1 (tuple): The coordinates of the second point in R^3.
-
-		Returns:
-			float: The Euclidean distance between p0 and p1.
-
-		"""
-		return np.sqrt((p0[0] - p1[0]) ** 2 +
-					   (p0[1] - p1[1]) ** 2 + (p0[2] - p1[2]) ** 2)
-
 	def calcFaceAreas(self, x, y):
 		"""
 		Calculate the area of each face in a quad mesh.
@@ -285,26 +521,66 @@ class remix:
 			>>> calcFaceAreas(numpy.array([[0., 1.], [1., 0.]]), numpy.array([[0., 1.], [1., 0.]]))
 			array([[2.]])
 		"""
-		(nLonP1, nLatP1) = x.shape
-		(nLon, nLat) = (nLonP1 - 1, nLatP1 - 1)
 		z = np.sqrt(1.0 - x ** 2 - y ** 2)
 
-		area = np.zeros((nLon, nLat))
-
-		#TODO: I hate explicit loops in python, this should be vectorized
-		for i in range(nLon):
-			for j in range(nLat):
-				left = self.distance((x[i, j], y[i, j], z[i, j]), (x[i, j + 1], y[i, j + 1], z[i, j + 1]))
-				right = self.distance((x[i + 1, j], y[i + 1, j], z[i + 1, j]), (x[i + 1, j + 1], y[i + 1, j + 1], z[i + 1, j + 1]))
-				top = self.distance((x[i, j + 1], y[i, j + 1], z[i, j + 1]), (x[i + 1, j + 1], y[i + 1, j + 1], z[i + 1, j + 1]))
-				bot = self.distance((x[i, j], y[i, j], z[i, j]), (x[i + 1, j], y[i + 1, j], z[i + 1, j]))
+		# Edge lengths along j (shape nLonP1,nLat) and along i (shape nLon,nLatP1),
+		# each edge is computed once and shared by the two faces it bounds
+		dj = np.hypot(np.hypot(x[:, 1:] - x[:, :-1], y[:, 1:] - y[:, :-1]), z[:, 1:] - z[:, :-1])
+		di = np.hypot(np.hypot(x[1:, :] - x[:-1, :], y[1:, :] - y[:-1, :]), z[1:, :] - z[:-1, :])
+		left, right = dj[:-1, :], dj[1:, :]
+		bot, top = di[:, :-1], di[:, 1:]
 
-				area[i, j] = 0.5 * (left + right) * 0.5 * (top + bot)
+		area = 0.5 * (left + right) * 0.5 * (top + bot)
 
 		return area
 
+	def _get_area(self, ri):
+		"""
+		Return the face areas of the remix grid scaled to a sphere of radius ri.
+
+		The unit-sphere areas are computed once per instance and reused.
+
+		Args:
+			ri (float): The radius of the sphere.
+
+		Returns:
+			numpy.ndarray: Array of face areas of shape (nLon, nLat).
+		"""
+		if self._areaMixGrid is None:
+			self._areaMixGrid = self.calcFaceAreas(self.ion['X'], self.ion['Y'])
+		return self._areaMixGrid * ri * ri
+
 
 	# TODO: define and consolidate allowed variable names
+	def _cornerCoords(self):
+		"""
+		Return the cell-center (theta, r) coordinates used for contour overplots.
+
+		The arrays are extended across the periodic boundary and through the pole,
+		and are computed once per instance.
+
+		Returns:
+			tuple: The extended theta and r arrays of shape (nLon+1, nLat+1).
+		"""
+		if self._cornerCoordsCache is None:
+			theta = self.ion['THETA']
+			r = self.ion['R']
+			tc = _cornerAvg(theta)
+			rc = _cornerAvg(r)
+
+			# trick to plot contours smoothly across the periodic boundary:
+			# wrap around: note, careful with theta -- need to add 2*pi to keep it ascending
+			# otherwise, contours mess up
+			tc = np.hstack([tc,2.*np.pi+tc[:,[0]]])
+			rc = np.hstack([rc,rc[:,[0]]])
+
+			# similar trick to make contours go through the pole
+			# add pole
+			tc = np.vstack([tc[[0],:],tc])
+			rc = np.vstack([0.*rc[[0],:],rc])
+			self._cornerCoordsCache = (tc, rc)
+		return self._cornerCoordsCache
+
 	def plot(self, varname, ncontours=16, addlabels={}, gs=None, doInset=False, doCB=True, doCBVert=True, doGTYPE=False, doPP=False):
 		"""
 		Plot the specified variable on a polar grid.
@@ -335,23 +611,12 @@ class remix:
 			Returns:
 				None
 			"""
-			tc = 0.25*(theta[:-1,:-1]+theta[1:,:-1]+theta[:-1,1:]+theta[1:,1:])
-			rc = 0.25*(r[:-1,:-1]+r[1:,:-1]+r[:-1,1:]+r[1:,1:])
-
-			# trick to plot contours smoothly across the periodic boundary:
-			# wrap around: note, careful with theta -- need to add 2*pi to keep it ascending
-			# otherwise, contours mess up
-			tc = np.hstack([tc,2.*np.pi+tc[:,[0]]])
-			rc = np.hstack([rc,rc[:,[0]]])
+			tc, rc = self._cornerCoords()
 			tmp=self.variables['potential']['data']
 			lower = self.variables['potential']['min']
 			upper = self.variables['potential']['max']
+			# wrap around the periodic boundary and add the pole, as in _cornerCoords
 			tmp = np.hstack([tmp,tmp[:,[0]]])
-
-			# similar trick to make contours go through the pole
-			# add pole
-			tc = np.vstack([tc[[0],:],tc])
-			rc = np.vstack([0.*rc[[0],:],rc])            
 			tmp = np.vstack([tmp[0,:].mean()*np.ones_like(tmp[[0],:]),tmp])                           
 
 			# finally, plot
@@ -386,21 +651,10 @@ class remix:
 			Returns:
 				None
 			"""
-			tc = 0.25 * (theta[:-1, :-1] + theta[1:, :-1] + theta[:-1, 1:] + theta[1:, 1:])
-			rc = 0.25 * (r[:-1, :-1] + r[1:, :-1] + r[:-1, 1:] + r[1:, 1:])
-
-			# trick to plot contours smoothly across the periodic boundary:
-			# wrap around: note, careful with theta -- need to add 2*pi to keep it ascending
-			# otherwise, contours mess up
-			tc = np.hstack([tc, 2. * np.pi + tc[:, [0]]])
-			rc = np.hstack([rc, rc[:, [0]]])
+			tc, rc = self._cornerCoords()
 			tmp = self.variables[con_name]['data']
+			# wrap around the periodic boundary and add the pole, as in _cornerCoords
 			tmp = np.hstack([tmp, tmp[:, [0]]])
-
-			# similar trick to make contours go through the pole
-			# add pole
-			tc = np.vstack([tc[[0], :], tc])
-			rc = np.vstack([0. * rc[[0], :], rc])
 			tmp = np.vstack([tmp[0, :].mean() * np.ones_like(tmp[[0], :]), tmp])
 
 			# finally, plot
@@ -485,12 +739,12 @@ class remix:
 		
 		if varname in ['eflux','Meflux','Deflux','Peflux']:
 			ri=6500.e3
-			areaMixGrid = self.calcFaceAreas(x,y)*ri*ri
+			areaMixGrid = self._get_area(ri)
 			hp = areaMixGrid*self.variables[varname]['data'][:,:]/(1.6e-9)
 			power = hp.sum()*1.6e-21
 		if (varname == 'current'):
 			ri=6500.e3
-			areaMixGrid = self.calcFaceAreas(x,y)*ri*ri
+			areaMixGrid = self._get_area(ri)
 			fac = self.variables[varname]['data'][:,:]
 			dfac = areaMixGrid[fac>0.]*fac[fac>0.]/1.0e12
 			pfac = dfac.sum()
@@ -571,6 +825,49 @@ class remix:
 	#     contour(theta+pi/2.,r,variables['potential']['data'][:,2:-1],21,colors='black')
 #                                      arange(variables['potential']['min'],variables['potential']['max'],21.),colors='purple')
 
+	def _geometry(self):
+		"""
+		Return the grid metrics used by efield and hCurrents, computed once per instance.
+
+		Returns:
+			dict: A dictionary containing
+				- 'dtheta': Cell widths in polar angle.
+				- 'dphi': Cell widths in azimuthal angle.
+				- 'sin_tc': Sine of the angle-averaged cell-center polar angle.
+				- 'cos_theta_c': Cosine of the polar angle of the Cartesian cell centers.
+				- 'sin_theta_c': Sine of the polar angle of the Cartesian cell centers.
+				- 'frame': (3,2,ntheta,nphi) matrix taking (theta,phi) vector components at the cell centers to (x,y,z).
+		"""
+		if self._geom is None:
+			# note the change in naming convention from above
+			# i.e., theta is now the polar angle
+			# and phi is the azimuthal (what was theta)
+			# TODO: make consistent throughout
+			theta = self.ion['THETA_POLAR']
+			phi   = self.ion['THETA']
+
+			tmp    = 0.5*(theta[:,1:]+theta[:,:-1])  # move to edge center
+			dtheta = tmp[1:,:]-tmp[:-1,:]
+			tmp    = 0.5*(phi[1:,:]+phi[:-1,:])
+			dphi   = tmp[:,1:]-tmp[:,:-1]
+			tc = _cornerAvg(theta)
+
+			xc,yc,thetaCC,phiCC = self.cartesianCellCenters()
+
+			cosT = np.cos(thetaCC)
+			sinT = np.sin(thetaCC)
+			cosP = np.cos(phiCC)
+			sinP = np.sin(phiCC)
+			frame = np.array([[cosT*cosP, -sinP],
+			                  [cosT*sinP,  cosP],
+			                  [    -sinT, np.zeros_like(sinT)]])
+
+			self._geom = {'dtheta': dtheta, 'dphi': dphi, 'sin_tc': np.sin(tc),
+				'cos_theta_c': cosT, 'sin_theta_c': sinT, 'frame': frame}
+			# efield and hCurrents hand dtheta and dphi back to their callers
+			_readOnly(*self._geom.values())
+		return self._geom
+
 	# FIXME: MAKE WORK FOR SOUTH (I THINK IT DOES BUT MAKE SURE)
 	def efield(self, returnDeltas=False, ri=Ri*1e3):
 		"""
@@ -594,33 +891,23 @@ class remix:
 		if not self.Initialized:
 			sys.exit("Variables should be initialized for the specific hemisphere (call init_var) prior to efield calculation.")
 
-		Psi = self.variables['potential']['data']  # note, these are numbers of cells. self.ion['X'].shape = Nr+1,Nt+1
+		# the gradient is taken from small differences, so work in double precision
+		Psi = self.variables['potential']['data'].astype(np.float64)  # note, these are numbers of cells. self.ion['X'].shape = Nr+1,Nt+1
 		Nt,Np = Psi.shape
 
 		# Aliases to keep things short
 		x = self.ion['X']
 		y = self.ion['Y']
 
-		# note the change in naming convention from above
-		# i.e., theta is now the polar angle
-		# and phi is the azimuthal (what was theta)
-		# TODO: make consistent throughout
-		theta = np.arcsin(self.ion['R'])
-		phi   = self.ion['THETA']
+		geom = self._geometry()
 
 		# interpolate Psi to corners
-		Psi_c = np.zeros(x.shape)
-		Psi_c[1:-1,1:-1] = 0.25*(Psi[1:,1:]+Psi[:-1,1:]+Psi[1:,:-1]+Psi[:-1,:-1])
-
-		# fix up periodic
-		Psi_c[1:-1,0]  = 0.25*(Psi[1:,0]+Psi[:-1,0]+Psi[1:,-1]+Psi[:-1,-1])
-		Psi_c[1:-1,-1] = Psi_c[1:-1,0]
-
-		# fix up pole
-		Psi_pole = Psi[0,:].mean()
-		Psi_c[0,1:-1] = 0.25*(2.*Psi_pole + Psi[0,:-1]+Psi[0,1:])
-		Psi_c[0,0]    = 0.25*(2.*Psi_pole + Psi[0,-1]+Psi[0,0])		
-		Psi_c[0,-1]   = 0.25*(2.*Psi_pole + Psi[0,-1]+Psi[0,0])				
+		# pad Psi periodically in phi and with a pole row of its mean value,
+		# so one 4-point average covers the interior, the periodic seam and the pole
+		Ppad = np.pad(Psi, ((1,0),(1,1)), mode='wrap')
+		Ppad[0,:] = Psi[0,:].mean()
+		Psi_c = np.empty(x.shape)
+		Psi_c[:-1,:] = _cornerAvg(Ppad)
 
 		# fix up low lat boundary
 		# extrapolate linearly just like we did for the coordinates
@@ -633,25 +920,29 @@ class remix:
 		# need to find the gradient at cell center
 		# the result is the same size as Psi
 
+		# the 0.5 of the edge-center averages and the sign of E = -grad Psi
+		# are folded into one scaling, and each component is built in place
+		scale = -0.5/ri
+
 		# first etheta
-		tmp    = 0.5*(Psi_c[:,1:]+Psi_c[:,:-1])  # move to edge center
-		dPsi   = tmp[1:,:]-tmp[:-1,:]
-		tmp    = 0.5*(theta[:,1:]+theta[:,:-1])
-		dtheta = tmp[1:,:]-tmp[:-1,:]
-		etheta = dPsi/dtheta/ri  # this is in V/m
+		tmp    = Psi_c[:,1:]+Psi_c[:,:-1]  # move to edge center
+		dtheta = geom['dtheta']
+		etheta = np.subtract(tmp[1:,:], tmp[:-1,:])
+		etheta /= dtheta
+		etheta *= scale  # this is in V/m
 
 		# now ephi
-		tmp    = 0.5*(Psi_c[1:,:]+Psi_c[:-1,:])  # move to edge center
-		dPsi   = tmp[:,1:]-tmp[:,:-1]
-		tmp    = 0.5*(phi[1:,:]+phi[:-1,:])
-		dphi   = tmp[:,1:]-tmp[:,:-1]
-		tc = 0.25*(theta[:-1,:-1]+theta[1:,:-1]+theta[:-1,1:]+theta[1:,1:]) # need this additionally 
-		ephi = dPsi/dphi/np.sin(tc)/ri  # this is in V/m
+		tmp    = Psi_c[1:,:]+Psi_c[:-1,:]  # move to edge center
+		dphi   = geom['dphi']
+		ephi   = np.subtract(tmp[:,1:], tmp[:,:-1])
+		ephi  /= dphi
+		ephi  /= geom['sin_tc']
+		ephi  *= scale  # this is in V/m
 
 		if returnDeltas:
-			return (-etheta,-ephi,dtheta,dphi)  # E = -grad Psi
+			return (etheta,ephi,dtheta,dphi)
 		else:	
-			return (-etheta,-ephi)  # E = -grad Psi			
+			return (etheta,ephi)
 
 	def joule(self):
 		"""
@@ -688,18 +979,23 @@ class remix:
 		Returns:
 			tuple: A tuple containing the Cartesian cell centers (xc, yc), theta, and phi.
 		"""
-		# Aliases to keep things short
-		x = self.ion['X']
-		y = self.ion['Y']
+		# the grid is fixed per file, so compute the centers once
+		if self._cellCenterCache is None:
+			# Aliases to keep things short
+			x = self.ion['X']
+			y = self.ion['Y']
 
-		xc = 0.25*(x[:-1,:-1]+x[1:,:-1]+x[:-1,1:]+x[1:,1:])
-		yc = 0.25*(y[:-1,:-1]+y[1:,:-1]+y[:-1,1:]+y[1:,1:])        
+			xc = _cornerAvg(x)
+			yc = _cornerAvg(y)
 
-		r,phi = self.get_spherical(xc,yc)
+			r,phi = self.get_spherical(xc,yc)
 
-		theta = np.arcsin(r)
+			theta = np.arcsin(r)
 
-		return(xc,yc,theta,phi)
+			# the cached arrays are handed out as-is, so keep callers from modifying them
+			self._cellCenterCache = _readOnly(xc,yc,theta,phi)
+
+		return self._cellCenterCache
 		
 	# FIXME: MAKE WORK FOR SOUTH
 	# TODO: write a separate geom function to define cell-centered coords, deltas, and even cosDipAngle (see comment above cartesianCellCenters)
@@ -730,11 +1026,24 @@ class remix:
 
 			xc,yc,theta,phi = self.cartesianCellCenters()
 
-			cosDipAngle = -2.*np.cos(theta)/np.sqrt(1.+3.*np.cos(theta)**2)
-			Jh_theta = -SigmaH*ephi/cosDipAngle
-			Jh_phi   =  SigmaH*etheta/cosDipAngle
-			Jp_theta =  SigmaP*etheta/cosDipAngle**2
-			Jp_phi   =  SigmaP*ephi
+			# cosDipAngle = -2 cos(theta)/sqrt(1+3 cos(theta)^2), built in place
+			ct = self._geometry()['cos_theta_c']
+			cosDipAngle = ct*ct
+			cosDipAngle *= 3.
+			cosDipAngle += 1.
+			np.sqrt(cosDipAngle, out=cosDipAngle)
+			np.divide(-2.*ct, cosDipAngle, out=cosDipAngle)
+
+			# reuse one reciprocal for the four current components
+			icd = 1./cosDipAngle
+			Jh_theta = SigmaH*ephi
+			Jh_theta *= -icd
+			Jh_phi   = SigmaH*etheta
+			Jh_phi   *= icd
+			Jp_theta = SigmaP*etheta
+			Jp_theta *= icd
+			Jp_theta *= icd
+			Jp_phi   = SigmaP*ephi
 
 
 			# current above is in SI units [A/m]
@@ -745,7 +1054,7 @@ class remix:
 	# This includes Hall, Pedersen and FAC with the option to do Hall only
 	# Rin = Inner boundary of MHD grid [Re]
 	# See Slava's paper notes
-	def dB(self, xyz, hallOnly=True, Rin=2.0, rsegments=10):
+	def dB(self, xyz, hallOnly=True, Rin=2.0, rsegments=10, useGPU=False, dtype=np.float64):
 		"""
 		Compute the magnetic field (B-field) at given points.
 
@@ -754,6 +1063,8 @@ class remix:
 			hallOnly (bool): Flag indicating whether to consider only the Hall current or both Hall and Pedersen currents. Default is True.
 			Rin (float): Inner radius of the flux tube in units of Ri. Default is 2.0.
 			rsegments (int): Number of segments to divide the flux tube into. Default is 10.
+			useGPU (bool): Do the Biot-Savart sums on the GPU with cupy. Default is False.
+			dtype (numpy.dtype): Precision of the Biot-Savart integrand, np.float32 halves the memory traffic at ~1e-6 relative error. The sums are always accumulated in float64. Default is np.float64.
 
 		Returns:
 			dBr (numpy.ndarray): Array of radial component of the B-field at each point.
@@ -768,63 +1079,32 @@ class remix:
 			sys.exit("dB input assumes the array of points of (N,3) size.")			
 		if xyz.shape[1]!=3: 
 			sys.exit("dB input assumes the array of points of (N,3) size.")
-
-		self.init_vars('NORTH')
+		if useGPU and cupy is None:
+			sys.exit("dB with useGPU=True requires cupy.")
+		bsSum = _bsSheetSumGPU if useGPU else _bsSheetSum
+		if self._loadedHemisphere == 'SOUTH':
+			raise ValueError("dB uses the NORTH hemisphere, but only SOUTH was loaded (remix(..., hemisphere='south'))")
+
+		if not self.Initialized or self._hemisphere != 'NORTH':
+			self.init_vars('NORTH')
 		x,y,theta,phi,dtheta,dphi,jht,jhp,jpt,jpp,cosDipAngle = self.hCurrents()
 		z =  np.sqrt(1.-x**2-y**2)  # ASSUME NORTH
 #		z = -np.sqrt(1.-x**2-y**2)	# ASSUME SOUTH
 
-		# fake dimensions for numpy broadcasting
-		xSource = x[:,:,np.newaxis]		
-		ySource = y[:,:,np.newaxis]		
-		zSource = z[:,:,np.newaxis]						
-
-		tSource = theta[:,:,np.newaxis]
-		pSource = phi[:,:,np.newaxis]
-		dtSource = dtheta[:,:,np.newaxis]
-		dpSource = dphi[:,:,np.newaxis]		
-
-		# Hall
-		jhTheta = jht[:,:,np.newaxis]
-		jhPhi   = jhp[:,:,np.newaxis]
-		# Pedersen
-		jpTheta = jpt[:,:,np.newaxis]
-		jpPhi   = jpp[:,:,np.newaxis]
-
 		if not hallOnly:
-			jTheta = jpTheta + jhTheta
-			jPhi   = jpPhi   + jhPhi
+			jTheta = jpt + jht
+			jPhi   = jpp + jhp
 		else:
-			jTheta = jhTheta
-			jPhi   = jhPhi
+			jTheta = jht
+			jPhi   = jhp
 
 		# convert to Cartesian for the Biot-Savart summation
 		# otherwise, spherical coordinates get mixed up betwen the source and destination grids
 		# theta_unit and phi_unit vectors rotate from point to point and are different on the two grids
-		jx = jTheta*np.cos(tSource)*np.cos(pSource) - jPhi*np.sin(pSource)
-		jy = jTheta*np.cos(tSource)*np.sin(pSource) + jPhi*np.cos(pSource)
-		jz =-jTheta*np.sin(tSource)
-
-		# x,y,z are size (ntheta,nphi)
-		# make array of destination points on the mix grid
-		# add fake dimension for numpy broadcasting
-		xDest = xyz[np.newaxis,np.newaxis,:,0]
-		yDest = xyz[np.newaxis,np.newaxis,:,1]
-		zDest = xyz[np.newaxis,np.newaxis,:,2]				
-
-		# up to here things are fast (checked for both source and destination 90x720 grids)
-		# the operations below are slow and kill the memory becase (90x720)^2 (the size of each array below) is ~30GB
-		# solution: break the destination grid up into pieces before passing here
-
-		# vector between destination and source
-		Rx = xDest - xSource
-		Ry = yDest - ySource
-		Rz = zDest - zSource
-		R  = np.sqrt(Rx**2+Ry**2+Rz**2)
+		# the local (theta,phi)->(x,y,z) frame is fixed by the grid and cached in _geometry
+		geom = self._geometry()
+		jx,jy,jz = np.einsum('abij,bij->aij', geom['frame'], np.stack([jTheta,jPhi]))
 
-		# vector product with the current
-		# note the multiplication by sin(tSource)*dtSource*dpSource -- area of the surface element
-		#
 		# note on normalization
 		# Efield is computed in V/m, sigma is also in SI units
 		# Current coming out of hCurrents() should be in SI units [A/m] (height integrated).
@@ -834,48 +1114,135 @@ class remix:
 		# where we have combined j and dr (= j dr) which is what is coming out of hCurrents in SI units
 		# and normalized everything else to Ri, which it already is in the code below
 		# in other words the fields below should be in [T]		
-		dA = np.sin(tSource)*dtSource*dpSource
-		dBx = mu0o4pi*np.sum( (jy*Rz - jz*Ry)*dA/R**3,axis=(0,1))
-		dBy = mu0o4pi*np.sum( (jz*Rx - jx*Rz)*dA/R**3,axis=(0,1))
-		dBz = mu0o4pi*np.sum( (jx*Ry - jy*Rx)*dA/R**3,axis=(0,1))
+		# note the multiplication by sin(theta)*dtheta*dphi -- area of the surface element
+		dA = geom['sin_theta_c']*dtheta*dphi
+
+		# the sum over (source,destination) pairs is done by _bsSheetSum (or its GPU version) on flat arrays
+		flat = lambda a: np.ascontiguousarray(a, dtype=dtype).ravel()
+		xyzD = np.asarray(xyz, dtype=dtype)
+		Ix,Iy,Iz = bsSum(flat(x), flat(y), flat(z), flat(jx), flat(jy), flat(jz), flat(dA),
+			flat(xyzD[:,0]), flat(xyzD[:,1]), flat(xyzD[:,2]))
+		dBx = mu0o4pi*Ix
+		dBy = mu0o4pi*Iy
+		dBz = mu0o4pi*Iz
 
 		if not hallOnly:
-			intx,inty,intz = self.BSFluxTubeInt(xyz,Rinner=Rin*Re/Ri,rsegments=rsegments)
 			# FIXME: don't fix sign for south
 			jpara = -self.variables['current']['data'] # note, the sign was inverted by the reader for north, put it back to recover true FAC 
-			jpara = jpara[:,:,np.newaxis]
-			cosd  = abs(cosDipAngle[:,:,np.newaxis])  # note, only need abs value of cosd regardless of hemisphere
+			cosd  = abs(cosDipAngle)  # note, only need abs value of cosd regardless of hemisphere
+			wFAC  = jpara*dA*cosd
 
 			# note on normalization
 			# jpara is in microA/m^2 -- convert to A (1.e-6)
 			# further, after all is said and done and all distance-like variables are accounted for
 			# the answer below should be multiplied by Ri in m (6.5e6)
 			# factors of 1.e6 cancel out and we only have Ri
-			dBx += Ri*mu0o4pi*np.sum(jpara*dA*cosd*intx,axis=(0,1))
-			dBy += Ri*mu0o4pi*np.sum(jpara*dA*cosd*inty,axis=(0,1))
-			dBz += Ri*mu0o4pi*np.sum(jpara*dA*cosd*intz,axis=(0,1))
+			# this is the sum of BSFluxTubeInt weighted by wFAC, i.e., the same Biot-Savart sum as the sheet above
+			# with the flux-tube segments as sources, b as the current direction and wFAC*dl as the weight
+			xm,ym,zm,bx,by,bz,dl = self._fluxTubeGeometry(Rin*Re/Ri,rsegments)
+			Ix,Iy,Iz = bsSum(flat(xm), flat(ym), flat(zm), flat(bx), flat(by), flat(bz), flat(dl*wFAC),
+				flat(xyzD[:,0]), flat(xyzD[:,1]), flat(xyzD[:,2]))
+			dBx += Ri*mu0o4pi*Ix
+			dBy += Ri*mu0o4pi*Iy
+			dBz += Ri*mu0o4pi*Iz
 
 
 		# finally, convert to spherical *at the destination*
 		# note, this is ugly because we specified the spherical grid before passing to this function (in calcdB.py)
 		# FIXME: think about how to make it less ugly
-		rDest = np.sqrt(xDest**2+yDest**2+zDest**2)
-		tDest = np.arccos(zDest/rDest)
-		pDest = np.arctan2(yDest,xDest)
-
-		dBr     = dBx*np.sin(tDest)*np.cos(pDest) + dBy*np.sin(tDest)*np.sin(pDest) + dBz*np.cos(tDest)
-		dBtheta = dBx*np.cos(tDest)*np.cos(pDest) + dBy*np.cos(tDest)*np.sin(pDest) - dBz*np.sin(tDest)	
-		dBphi   =-dBx*np.sin(pDest) + dBy*np.cos(pDest)
+		# the angles are only needed through their sines and cosines, which are ratios of the coordinates
+		# destination points get fake dimensions to keep the (1,1,N) output shape
+		xDest = np.asarray(xyz[:,0], dtype=np.float64)[np.newaxis,np.newaxis,:]
+		yDest = np.asarray(xyz[:,1], dtype=np.float64)[np.newaxis,np.newaxis,:]
+		zDest = np.asarray(xyz[:,2], dtype=np.float64)[np.newaxis,np.newaxis,:]
+		rhoDest = np.hypot(xDest,yDest)
+		rDest = np.hypot(rhoDest,zDest)
+		cosTd = zDest/rDest
+		sinTd = rhoDest/rDest
+		# on the z axis phi=0, as arctan2(0,0) gives
+		cosPd = np.divide(xDest, rhoDest, out=np.ones_like(rhoDest), where=rhoDest>0)
+		sinPd = np.divide(yDest, rhoDest, out=np.zeros_like(rhoDest), where=rhoDest>0)
+
+		dBr     = dBx*sinTd*cosPd + dBy*sinTd*sinPd + dBz*cosTd
+		dBtheta = dBx*cosTd*cosPd + dBy*cosTd*sinPd - dBz*sinTd
+		dBphi   =-dBx*sinPd + dBy*cosPd
 		return(dBr,dBtheta,dBphi)
 
+	def _fluxTubeGeometry(self,Rinner,rsegments):
+		"""
+		Compute the dipole flux-tube segments above each ionospheric cell center.
+
+		The result depends only on the grid, so it is cached per (Rinner, rsegments).
+
+		Args:
+			Rinner (float): The radius of the inner boundary of the MHD domain expressed in Ri
+			rsegments (int): Number of segments along each flux tube.
+
+		Returns:
+			tuple: Segment centers (x, y, z), unit B-vectors (bx, by, bz) and segment lengths dl,
+				each of shape (rsegments, ntheta, nphi).
+		"""
+		key = (Rinner, rsegments)
+		if key not in self._fluxTubeCache:
+			xc,yc,theta,phi = self.cartesianCellCenters()
+
+			# radii of centers of segments of the flux tube
+			# the segments are uniform in R, so their length dR is a scalar
+			dR = (Rinner-1.)/rsegments
+			Rcenters = 1.+(np.arange(rsegments)+0.5)*dR
+
+			# add fake dims to conform to theta & phi size
+			Rcenters = Rcenters[:,np.newaxis,np.newaxis]
+
+			# theta on the field line (m for magnetosphere)
+			# note, since theta is in [0,45] deg range or so,
+			# Rcenters is in the range [1,2] or so, and
+			# arsin is in the range [-pi/2,pi/2]
+			# the result below is >0, i.e., we only take the part of the field line
+			# that lies in the same hemisphere as the ionospheric footpoint
+			# sin(thetam) = sqrt(Rcenters)*sin(theta) and thetam is in [0,pi/2], so both
+			# trig functions follow without evaluating the arcsin
+			st = np.sqrt(Rcenters)*np.sin(theta)
+			ct = np.sqrt(1.-st**2)
+			cp = np.cos(phi)
+			sp = np.sin(phi)
+
+			# note order: R, theta, phi
+			x = Rcenters*st*cp
+			y = Rcenters*st*sp
+			z = Rcenters*ct
+
+			# distance along flux tube for given dR
+#			dl = dR*np.sqrt(1.+Rcenters*np.sin(theta)**2/4./(1.-Rcenters*np.sin(theta)**2))
+			dl = dR*np.sqrt(1.+3.*ct**2)/2./ct
+
+			# unit vector in B-direction (e.g., Baumjohann Eq. 3.1 -- note their use of latitude vs colatitude)
+#			br = -2.*np.sqrt(1-Rcenters*np.sin(theta)**2)/np.sqrt(4.-3.*Rcenters*np.sin(theta)**2)
+#			bt = -np.sqrt(Rcenters)*np.sin(theta)/np.sqrt(4.-3.*Rcenters*np.sin(theta)**2)
+			den = np.sqrt(st**2+4.*ct**2)
+			br = -2.*ct/den
+			bt = -st/den
+
+			# now the same in cartesian
+			bxy = br*st + bt*ct
+			bx = bxy*cp
+			by = bxy*sp
+			bz = br*ct - bt*st
+
+			# shared by every dB/BSFluxTubeInt call with this key, so keep it read-only
+			self._fluxTubeCache[key] = _readOnly(x,y,z,bx,by,bz,dl)
+		return self._fluxTubeCache[key]
+
 	# FIXME: Make work for SOUTH
-	def BSFluxTubeInt(self,xyz,Rinner,rsegments = 10):
+	def BSFluxTubeInt(self,xyz,Rinner,rsegments = 10,dtype=np.float64):
 		"""
 		Compute flux-tube Biot-Savart integral \int dl bhat x r'/|r'|^3
 
 		Args:
 			xyz (numpy.ndarray): array of points where to compute dB  (same as above in dB). xyz.shape should be (N,3), where N is the number of points. xyz = (x,y,z) in units of Ri
 			Rinner (float): The radius of the inner boundary of the MHD domain expressed in Ri
+			rsegments (int): Number of segments to divide the flux tube into. Default is 10.
+			dtype (numpy.dtype): Precision of the (R,t,p,N) integrand, np.float32 halves its memory at ~1e-6 relative error. The results are always float64. Default is np.float64.
 
 		Returns:
 			intx (float): x component of the flux tube integral
@@ -889,69 +1256,43 @@ class remix:
 		if xyz.shape[1]!=3: 
 			sys.exit("dB input assumes the array of points of (N,3) size.")
 
-		xc,yc,theta,phi = self.cartesianCellCenters()
-
-		# radii of centers of segments of the flux tube
-		Rs = np.linspace(1.,Rinner,rsegments+1)
-		Rcenters = 0.5*(Rs[:-1]+Rs[1:])
-		dR = Rs[1:]-Rs[:-1]
-
-		# add fake dims to conform to theta & phi size
-		Rcenters = Rcenters[:,np.newaxis,np.newaxis]
-		dR = dR[:,np.newaxis,np.newaxis]		
-
-		# theta on the field line (m for magnetosphere)
-		# note, since theta is in [0,45] deg range or so,
-		# Rcenters is in the range [1,2] or so, and
-		# arsin is in the range [-pi/2,pi/2]
-		# the result below is >0, i.e., we only take the part of the field line
-		# that lies in the same hemisphere as the ionospheric footpoint
-		thetam = np.arcsin(np.sqrt(Rcenters)*np.sin(theta))   
-
-		# note order: R, theta, phi
-		x = Rcenters*np.sin(thetam)*np.cos(phi)
-		y = Rcenters*np.sin(thetam)*np.sin(phi)
-		z = np.sqrt(Rcenters**2-x**2-y**2)
-
-		# distance along flux tube for given dR
-#		dl = dR*np.sqrt(1.+Rcenters*np.sin(theta)**2/4./(1.-Rcenters*np.sin(theta)**2))
-		dl = dR*np.sqrt(1.+3.*np.cos(thetam)**2)/2./np.cos(thetam)
-
-		# unit vector in B-direction (e.g., Baumjohann Eq. 3.1 -- note their use of latitude vs colatitude)
-#		br = -2.*np.sqrt(1-Rcenters*np.sin(theta)**2)/np.sqrt(4.-3.*Rcenters*np.sin(theta)**2)
-#		bt = -np.sqrt(Rcenters)*np.sin(theta)/np.sqrt(4.-3.*Rcenters*np.sin(theta)**2)
-		br = -2.*np.cos(thetam)/np.sqrt(np.sin(thetam)**2+4.*np.cos(thetam)**2)
-		bt = -np.sin(thetam)/np.sqrt(np.sin(thetam)**2+4.*np.cos(thetam)**2)
-
-		# now the same in cartesian
-		bx = br*np.sin(thetam)*np.cos(phi) + bt*np.cos(thetam)*np.cos(phi)
-		by = br*np.sin(thetam)*np.sin(phi) + bt*np.cos(thetam)*np.sin(phi)
-		bz = br*np.cos(thetam) - bt*np.sin(thetam)
-
-		# fake dimensions for numpy broadcasting
-		# remember dimenstions: R,t,p along field line + adding the destination point number
-		xSource = x[:,:,:,np.newaxis]
-		ySource = y[:,:,:,np.newaxis]
-		zSource = z[:,:,:,np.newaxis]
-
-		bx = bx[:,:,:,np.newaxis]
-		by = by[:,:,:,np.newaxis]
-		bz = bz[:,:,:,np.newaxis]
-		dl = dl[:,:,:,np.newaxis]
-
-		xDest = xyz[np.newaxis,np.newaxis,np.newaxis,:,0]
-		yDest = xyz[np.newaxis,np.newaxis,np.newaxis,:,1]
-		zDest = xyz[np.newaxis,np.newaxis,np.newaxis,:,2]				
-
-		# vector between destination and source
-		Rx = xDest - xSource
-		Ry = yDest - ySource
-		Rz = zDest - zSource
-		R  = np.sqrt(Rx**2+Ry**2+Rz**2)
+		x,y,z,bx,by,bz,dl = self._fluxTubeGeometry(Rinner,rsegments)
+
+		# as in _bsSheetSum, b x R = b x d - b x s and |R|^2 = |s|^2 + |d|^2 - 2 s.d,
+		# so only the weights dl/|R|^3 are (R,t,p,N) and both the s.d products and
+		# the sum along the field line are matmuls
+		# remember dimensions: R,t,p along field line + adding the destination point number
+		src = np.stack([x,y,z],axis=-1).astype(dtype,copy=False)
+		B6 = np.stack([bx,by,bz,by*z-bz*y,bz*x-bx*z,bx*y-by*x],axis=-1).astype(dtype,copy=False)
+		dl = dl.astype(dtype,copy=False)
+		xyzD = np.asarray(xyz,dtype=dtype)
+
+		if src.dtype == np.float32:
+			# the |R|^2 expansion cancels badly in single precision, form R = d - s directly
+			R2 = (xyzD[:,0]-src[...,0:1])**2
+			R2 += (xyzD[:,1]-src[...,1:2])**2
+			R2 += (xyzD[:,2]-src[...,2:3])**2
+		else:
+			R2 = src @ xyzD.T
+			R2 *= -2.
+			R2 += (src*src).sum(axis=-1)[...,np.newaxis]
+			R2 += (xyzD*xyzD).sum(axis=-1)
+		# dl/|R|^3 once for all three components
+		w = np.sqrt(R2)
+		w *= R2
+		np.divide(dl[...,np.newaxis], w, out=w)
+
+		# sum along the field line: (t,p,N,R) @ (t,p,R,6)
+		# only rsegments terms, the double precision is restored before the vector product below cancels
+		WB = np.matmul(w.transpose(1,2,3,0), B6.transpose(1,2,0,3)).astype(np.float64,copy=False)
 
 		# vector product with the current
-		intx = np.sum( dl*(by*Rz - bz*Ry)/R**3,axis=0)
-		inty = np.sum( dl*(bz*Rx - bx*Rz)/R**3,axis=0)
-		intz = np.sum( dl*(bx*Ry - by*Rx)/R**3,axis=0)
+		xyzD = np.asarray(xyz,dtype=np.float64)
+		xDest = xyzD[:,0]
+		yDest = xyzD[:,1]
+		zDest = xyzD[:,2]
+		intx = WB[...,1]*zDest - WB[...,2]*yDest - WB[...,3]
+		inty = WB[...,2]*xDest - WB[...,0]*zDest - WB[...,4]
+		intz = WB[...,0]*yDest - WB[...,1]*xDest - WB[...,5]
 
 		return(intx,inty,intz)
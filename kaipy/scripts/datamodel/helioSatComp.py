@@ -17,6 +17,7 @@ Mike Wiltberger
 # Standard modules
 import argparse
 from argparse import RawTextHelpFormatter
+from concurrent.futures import ProcessPoolExecutor
 import os
 import importlib.resources as pkg_resources
 
@@ -52,6 +53,9 @@ default_runid = "wsa"
 # Defaut number of segments to process.
 default_numSeg = 1
 
+# Default number of processes used to draw the comparison plots.
+default_ncpus = 1
+
 # Default path to model results directory.
 default_path = os.getcwd()
 
@@ -96,6 +100,11 @@ def create_command_line_parser():
     parser.add_argument(
         "-k", "--keep", action="store_true", default=False,
         help="Keep intermediate files (default: %(default)s).")
+    parser.add_argument(
+        "--ncpus", type=int, metavar="ncpus", default=default_ncpus,
+        help="Number of processes drawing the comparison plots, while the next " +
+             "spacecraft is fetched (default: %(default)s)."
+    )
     parser.add_argument(
         "-n", "--numSeg", type=int, metavar="number_segments",default=default_numSeg,
         help="Number of segments to simultaneously process (default: %(default)s).")
@@ -122,12 +131,16 @@ def main():
 
     # Parse the command-line arguments.
     args = parser.parse_args()
+
+    # Plots are only written to files, render them off-screen.
+    kv.useAgg()
     cmd_sctrack = args.cmd
     debug = args.debug
     cdaweb_data_interval = args.deltaT
     gh_run_id = args.id
     keep = args.keep
     num_segments = args.numSeg
+    ncpus = args.ncpus
     gh_result_directory = args.path
     sc_to_compare = args.satId
     verbose = args.verbose
@@ -261,6 +274,13 @@ def main():
     if debug:
         print("sc_to_compare = %s" % sc_to_compare)
 
+    # Plots are independent of each other, with more than one CPU they are
+    # drawn in worker processes while the main loop moves on.
+    executor = None
+    plot_jobs = []
+    if ncpus > 1:
+        executor = ProcessPoolExecutor(max_workers=ncpus, initializer=kv.useAgg)
+
     # Fetch the ephemeris and observed data for each spacecraft in the list.
     for sc_id in sc_to_compare:
 
@@ -333,7 +353,12 @@ def main():
         if verbose:
             print("Saving gamhelio-%s comparison plots in %s." %
                   (sc_id, plot_file_path))
-        kv.helioCompPlot_new(plot_file_path, sc_id, sc_data)
+        if executor is None:
+            kv.helioCompPlot_new(plot_file_path, sc_id, sc_data)
+        else:
+            plot_jobs.append(
+                executor.submit(kv.helioCompPlot_new, plot_file_path, sc_id, sc_data)
+            )
 
         # Plot the spacecraft trajectory.
         # plot_file_path = os.path.join(gh_result_directory, sc_id + "-traj.png")
@@ -341,5 +366,11 @@ def main():
         #     print("Plotting %s trajectory in spacecraft frame to %s." % (sc_id, plot_file_path))
         # kv.helioTrajPlot(plot_file_path, sc_id, sc_data)
 
+    # Wait for the remaining plots, re-raising any errors.
+    if executor is not None:
+        for job in plot_jobs:
+            job.result()
+        executor.shutdown()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
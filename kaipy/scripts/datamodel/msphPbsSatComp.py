@@ -53,6 +53,8 @@ def create_command_line_parser():
 def main():
     parser = create_command_line_parser()
     args = parser.parse_args()
+    #Plots are only written to files
+    kv.useAgg()
 
     fdir = args.path
     ftag = args.id
@@ -105,6 +107,9 @@ def main():
         scToDo = []
         scToDo.append(scRequested)
 
+    #Same two figures are reused for every spacecraft
+    compFig = kv.getFig((10,10))
+    trajFig = kv.getFig((15,5))
     for scId in scToDo:
         print('Getting spacecraft data for', scId)
         status,data = scutils.getSatData(scIds[scId],
@@ -150,13 +155,13 @@ def main():
                 dm.toCDF(cdfname,data)
                 plotname = os.path.join(fdir,scId+'.png')
                 print('Plotting results to',plotname)
-                kv.compPlot(plotname,scId,data)
+                kv.compPlot(plotname,scId,data,fig=compFig)
                 print('Computing Errors')
                 errname = os.path.join(fdir,scId+'-error.txt')
                 scutils.errorReport(errname,scId,data)
                 plotname = os.path.join(fdir,scId+'-traj.png')
                 print('Plotting trajectory to',plotname)
-                kv.trajPlot(plotname,scId,data,toRe)
+                kv.trajPlot(plotname,scId,data,toRe,fig=trajFig)
                 if not keep:
                     h5parts = glob.glob(os.path.join(fdir,scId)+'.*.sc.h5')
                     for file in h5parts:
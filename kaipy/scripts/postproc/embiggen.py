@@ -153,21 +153,27 @@ def main():
 			print("Upscaling data ...")
 			#Do upscaling
 			Xr,Yr,Zr = upscl.upGrid(X,Y,Z)
-			Gr = upscl.upGas(X,Y,Z,G,Xr.T,Yr.T,Zr.T)
+			#Cell volumes are shared by all gas variables
+			dV  = upscl.Volume(X,Y,Z)
+			dVr = upscl.Volume(Xr.T,Yr.T,Zr.T)
+			Gr = upscl.upGas(X,Y,Z,G,Xr.T,Yr.T,Zr.T,dV=dV,dVu=dVr)
 			FluxR = upscl.upFlux(X,Y,Z,M,Xr,Yr,Zr)
-			oGr = upscl.upGas(X,Y,Z,oG,Xr.T,Yr.T,Zr.T)
+			oGr = upscl.upGas(X,Y,Z,oG,Xr.T,Yr.T,Zr.T,dV=dV,dVu=dVr)
 			oFluxR = upscl.upFlux(X,Y,Z,oM,Xr,Yr,Zr)
 			if (doGas0):
-				G0r = upscl.upGas(X,Y,Z,G0,Xr.T,Yr.T,Zr.T)
+				G0r = upscl.upGas(X,Y,Z,G0,Xr.T,Yr.T,Zr.T,dV=dV,dVu=dVr)
 		else:
 			print("Downscaling data ...")
 			Xr,Yr,Zr = upscl.downGrid(X,Y,Z)
-			Gr = upscl.downGas(X,Y,Z,G,Xr.T,Yr.T,Zr.T)
+			#Cell volumes are shared by all gas variables
+			dV  = upscl.Volume(X,Y,Z)
+			dVr = upscl.Volume(Xr.T,Yr.T,Zr.T)
+			Gr = upscl.downGas(X,Y,Z,G,Xr.T,Yr.T,Zr.T,dV=dV,dVd=dVr)
 			FluxR = upscl.downFlux(X,Y,Z,M,Xr,Yr,Zr)
-			oGr = upscl.downGas(X,Y,Z,oG,Xr.T,Yr.T,Zr.T)
+			oGr = upscl.downGas(X,Y,Z,oG,Xr.T,Yr.T,Zr.T,dV=dV,dVd=dVr)
 			oFluxR = upscl.downFlux(X,Y,Z,oM,Xr,Yr,Zr)
 			if (doGas0):
-				G0r = upscl.downGas(X,Y,Z,G0,Xr.T,Yr.T,Zr.T)
+				G0r = upscl.downGas(X,Y,Z,G0,Xr.T,Yr.T,Zr.T,dV=dV,dVd=dVr)
 	else:
 		#No rescale, just set variables
 		Xr = X.T #Adding transpose to be consistent w/ rescaling code
@@ -7,7 +7,6 @@ import os
 # Third-party modules
 import h5py as h5
 import xml.etree.ElementTree as et
-import xml.dom.minidom
 import numpy as np
 
 # Kaipy modules
@@ -247,71 +246,71 @@ def main():
 
 	#Construct XDMF XML file
 	#-----------------------
-	Xdmf = et.Element("Xdmf")
-	Xdmf.set("Version","2.0")
-	
-	Dom = et.SubElement(Xdmf,"Domain")
-	
-	TGrid = et.SubElement(Dom,"Grid")
-	TGrid.set("Name","tMesh")
-	TGrid.set("GridType","Collection")
-	TGrid.set("CollectionType","Temporal")
-
-	#Loop over time slices
-	print("Writing info for each step")
-	for n in range(Nt):
-		nStp = sIDs[n]
-		Grid = et.SubElement(TGrid,"Grid")
-		mStr = "gMesh"#+str(nStp)
-		Grid.set("Name",mStr)
-		Grid.set("GridType","Uniform")
-
-		Topo = et.SubElement(Grid,"Topology")
-		Topo.set("TopologyType",topoStr)
-		Topo.set("NumberOfElements",gDimStr)
-		Geom = et.SubElement(Grid,"Geometry")
-		Geom.set("GeometryType",geoStr)
-		
-		#Add grid info to each step
-		if doAppendStep:
-			stepStr = sIDstrs[n]
-			sgVars = [os.path.join(stepStr, v) for v in gridVars]
-			kxmf.AddGrid(fNames_link[n],Geom,gDimStr,sgVars)
-		else:
-			kxmf.AddGrid(fNames_link[n],Geom,gDimStr,gridVars)
-
-		Time = et.SubElement(Grid,"Time")
-		Time.set("Value","%f"%T[n])
-
-		if preset=="rcm3D":
-			with h5.File(h5fname,'r') as f5:
-				other  = et.SubElement(Grid, "dtCpl")
-				other.set("Value","%f"%f5[sIDstrs[n]].attrs['dtCpl'])
-
-		#--------------------------------
-		#Step variables
-		for v in range(Nv):
-			vDimStr = vDimStr_corner if vLocs[v]=="Node" else vDimStr_cc
-			kxmf.AddData(Grid,fNames_link[n],vIds[v],vLocs[v],vDimStr,steps_link[n])
-		#--------------------------------
-		#Base grid variables
-		for v in range(Nrv):
-			vDimStr = vDimStr_corner if rvLocs[v]=="Node" else vDimStr_cc
-			kxmf.AddData(Grid,fNames_link[n],rvIds[v],rvLocs[v],vDimStr)
-
-		if doAddRCMVars:
-			addRCMVars(Grid, dimInfo, rcmInfo, sIDs[n])
-
-		#--------------------------------
-		#Add some extra aliases
-		if preset=="gam":
-			kxmf.AddVectors(Grid,h5fname,vIds,cDims,vDims,Nd,nStp)
-
-	#Finished creating XML tree, now write
-	xmlStr = xml.dom.minidom.parseString(et.tostring(Xdmf)).toprettyxml(indent="    ")
+	#Each step's Grid is serialized as soon as it is built, so only one step is held in memory
+	#Indentation matches the enclosing Xdmf/Domain/Grid tags written below
 	print("Saving as {}".format(fOutXML))
 	with open(fOutXML,"w") as f:
-		f.write(xmlStr)
+		f.write('<?xml version="1.0" ?>\n')
+		f.write('<Xdmf Version="2.0">\n')
+		f.write('    <Domain>\n')
+		f.write('        <Grid Name="tMesh" GridType="Collection" CollectionType="Temporal">\n')
+
+		#Loop over time slices
+		print("Writing info for each step")
+		for n in range(Nt):
+			nStp = sIDs[n]
+			Grid = et.Element("Grid")
+			mStr = "gMesh"#+str(nStp)
+			Grid.set("Name",mStr)
+			Grid.set("GridType","Uniform")
+
+			Topo = et.SubElement(Grid,"Topology")
+			Topo.set("TopologyType",topoStr)
+			Topo.set("NumberOfElements",gDimStr)
+			Geom = et.SubElement(Grid,"Geometry")
+			Geom.set("GeometryType",geoStr)
 		
+			#Add grid info to each step
+			if doAppendStep:
+				stepStr = sIDstrs[n]
+				sgVars = [os.path.join(stepStr, v) for v in gridVars]
+				kxmf.AddGrid(fNames_link[n],Geom,gDimStr,sgVars)
+			else:
+				kxmf.AddGrid(fNames_link[n],Geom,gDimStr,gridVars)
+
+			Time = et.SubElement(Grid,"Time")
+			Time.set("Value","%f"%T[n])
+
+			if preset=="rcm3D":
+				with h5.File(h5fname,'r') as f5:
+					other  = et.SubElement(Grid, "dtCpl")
+					other.set("Value","%f"%f5[sIDstrs[n]].attrs['dtCpl'])
+
+			#--------------------------------
+			#Step variables
+			for v in range(Nv):
+				vDimStr = vDimStr_corner if vLocs[v]=="Node" else vDimStr_cc
+				kxmf.AddData(Grid,fNames_link[n],vIds[v],vLocs[v],vDimStr,steps_link[n])
+			#--------------------------------
+			#Base grid variables
+			for v in range(Nrv):
+				vDimStr = vDimStr_corner if rvLocs[v]=="Node" else vDimStr_cc
+				kxmf.AddData(Grid,fNames_link[n],rvIds[v],rvLocs[v],vDimStr)
+
+			if doAddRCMVars:
+				addRCMVars(Grid, dimInfo, rcmInfo, sIDs[n])
+
+			#--------------------------------
+			#Add some extra aliases
+			if preset=="gam":
+				kxmf.AddVectors(Grid,h5fname,vIds,cDims,vDims,Nd,nStp)
+
+			et.indent(Grid,space="    ",level=3)
+			f.write("            "+et.tostring(Grid,encoding="unicode")+"\n")
+
+		f.write('        </Grid>\n')
+		f.write('    </Domain>\n')
+		f.write('</Xdmf>\n')
+
 if __name__ == "__main__":
 	main()
\ No newline at end of file
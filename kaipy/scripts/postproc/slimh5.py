@@ -4,12 +4,16 @@
 # Standard modules
 import argparse
 import os
+import sys
+from multiprocessing import Pool
 
 # Third-party modules
 import h5py
 import numpy as np
 
 cacheName = "timeAttributeCache"
+#Raw chunk cache for the input file (h5py default is 1 MiB)
+rdccBytes = 64*1024*1024
 
 def genMPIStr(di,dj,dk,i,j,k,n_pad=4):
     inpList = [di, dj, dk, i, j, k]
@@ -19,49 +23,160 @@ def genMPIStr(di,dj,dk,i,j,k,n_pad=4):
 
 def cntSteps(fname):
     """
-    Get the list of group names in the HDF5 file and filter out the ones that contain "/Step#".
-    Count the number of steps based on the filtered group names.
+    Get the step ids in the HDF5 file, from the time attribute cache if present,
+    otherwise from the names of the root "Step#" groups.
+    Count the number of steps based on the step ids.
 
     :param fname: str, the filename of the HDF5 file.
     :return: nSteps: int, the number of steps.
+    :return: sIds: ndarray, the step ids.
     """
     with h5py.File(fname,'r') as hf:
-        """
-        grps = hf.values()
-        grpNames = [str(grp.name) for grp in grps]
-        #Steps = [stp if "/Step#" in stp for stp in grpNames]
-        Steps = [stp for stp in grpNames if "/Step#" in stp]
-        nSteps = len(Steps)
-        """
-        #sIds = np.array([str.split(s,"#")[-1] for s in Steps],dtype=int)
         if(cacheName in hf.keys() and 'step' in hf[cacheName].keys()):
             sIds = np.asarray(hf[cacheName]['step'])
             nSteps = sIds.size
         else:
-            sIds = np.array([str.split(s,"#")[-1] for s in hf.keys() if "Step#" in s],dtype=int)
-            nSteps = len(sIds)
+            #Only the root links are needed, a visit would also walk every dataset inside every step
+            sIds = np.fromiter((int(s[5:]) for s in hf if s.startswith("Step#")),dtype=np.int64)
+            nSteps = sIds.size
     return nSteps,sIds
 
-def createfile(iH5,fOut):
+def getRootVars(iH5):
+    """
+    Walk the root links of the HDF5 file once and keep the names of the objects
+    that are copied as-is into every output file, i.e. everything but the steps and the cache.
+
+    :param iH5: h5py.File, the open input file.
+    :return: rootVars: list, names of the root objects to copy.
+    """
+    return [str(Q) for Q in iH5 if "Step" not in Q and cacheName not in Q]
+
+def copyObj(iH5,src,oGrp,name,dsetOpts=None):
+    """
+    Copy a group or dataset into oGrp under a new name.
+    Without dsetOpts the native HDF5 object copy is used, which keeps the source layout and filters.
+    Otherwise datasets are rewritten chunked with the create_dataset filter options in dsetOpts.
+
+    :param iH5: h5py.File, the open input file.
+    :param src: str or h5py object, the object to copy.
+    :param oGrp: h5py.Group, the destination group.
+    :param name: str, the name of the copy in oGrp.
+    :param dsetOpts: dict, filter keywords for create_dataset (e.g. compression, shuffle).
+    """
+    if not dsetOpts:
+        iH5.copy(src,oGrp,name=name)
+        return
+    obj = iH5[src] if isinstance(src,str) else src
+    if isinstance(obj,h5py.Group):
+        grp = oGrp.create_group(name)
+        grp.attrs.update(obj.attrs)
+        for Q in obj:
+            copyObj(iH5,obj[Q],grp,str(Q),dsetOpts)
+    elif obj.shape:
+        dOut = oGrp.create_dataset(name,data=obj[()],chunks=True,**dsetOpts)
+        dOut.attrs.update(obj.attrs)
+    else:
+        #Scalars can't be chunked or filtered
+        iH5.copy(obj,oGrp,name=name)
+
+def createfile(iH5,fOut,rootVars=None,dsetOpts=None):
     print('Creating new output file:',fOut)
     oH5 = h5py.File(fOut,'w')
+    if rootVars is None:
+        rootVars = getRootVars(iH5)
 
     #Start by scraping all variables from root
     #Copy root attributes
-    for k in iH5.attrs.keys():
-        aStr = str(k)
-        oH5.attrs.create(k,iH5.attrs[aStr])
+    oH5.attrs.update(iH5.attrs)
     #Copy root groups
-    for Q in iH5.keys():
-        sQ = str(Q)
-        #Don't include stuff that starts with "Step"
-        if "Step" not in sQ and cacheName not in sQ:
-            oH5.create_dataset(sQ,data=iH5[sQ])
-        if cacheName in sQ:
-            oH5.create_group(sQ)
+    for sQ in rootVars:
+        #Native HDF5 object copy unless compressing, keeps the dataset attributes and skips the numpy round trip
+        copyObj(iH5,sQ,oH5,sQ,dsetOpts)
+    if cacheName in iH5:
+        oH5.create_group(cacheName)
     return oH5
 
 
+def slimFile(fIn,fOut,Ns,Ne,Nsk,Nsf,N0,p,outTag,runTag=None,mpiStr=None,dsetOpts=None):
+    """
+    Slim a single input file down to the steps Ns:Ne:Nsk, starting a new output file every Nsf steps.
+    Each call opens its own files, so separate input files can be processed in parallel.
+
+    :param fIn: str, the filename of the input HDF5 file.
+    :param fOut: str, the filename of the first output HDF5 file.
+    :param Ns, Ne, Nsk: int, start, end and stride of the steps to keep.
+    :param Nsf: int, the number of steps per output file.
+    :param N0: int, the first step id in the input file.
+    :param p: bool, preserve the step numbers instead of relabeling from Step#0.
+    :param outTag: str, the output filename tag.
+    :param runTag: str, the run tag of an MPI decomposed run.
+    :param mpiStr: str, the MPI rank string of this file, None for non-MPI files.
+    :param dsetOpts: dict, filter keywords for the output datasets, None keeps the input layout.
+    """
+    #Open both files, get to work
+    iH5 = h5py.File(fIn,'r',rdcc_nbytes=rdccBytes)
+    #Root vars are scanned once per input file and reused for every output file
+    rootVars = getRootVars(iH5)
+    oH5=createfile(iH5,fOut,rootVars,dsetOpts)
+
+    #Now loop through steps and do same thing
+    nOut = 0
+    for n in range(Ns,Ne,Nsk):
+        if(p):nOut = n
+        gIn = "Step#%d"%(n)
+        gOut = "Step#%d"%(nOut)
+        if(not p): nOut = nOut+1 # use the same group numbers as originally in file - frt
+
+        print("Copying %s to %s"%(gIn,gOut))
+
+        #Copy the whole step group (vars + atts) in a single libhdf5 call,
+        #data goes file-to-file without passing through numpy, so there are no
+        #per-dataset reads/writes left to batch. Compressed output rewrites each dataset instead
+        copyObj(iH5,gIn,oH5,gOut,dsetOpts)
+
+    #If cache present
+    #Add the cache after steps, select the same steps for the cache that are contained in the
+    #Ns:Ne:Nsk start,end,stride
+    if cacheName in iH5:
+        #Same strided selection for every cache variable, a regular hyperslab rather than a point list
+        cacheSel = slice(Ns-N0,Ne-N0,Nsk)
+        #Cache variables mostly share one shape/dtype, so read them into reused buffers
+        cacheBufs = {}
+        for Q in iH5[cacheName].keys():
+            sQ = str(Q)
+            dIn = iH5[cacheName][sQ]
+            nSel = len(range(*cacheSel.indices(dIn.shape[0])))
+            bKey = ((nSel,)+dIn.shape[1:],dIn.dtype)
+            if bKey not in cacheBufs:
+                cacheBufs[bKey] = np.empty(bKey[0],dtype=bKey[1])
+            buf = cacheBufs[bKey]
+
+            if(sQ == "step"):
+                if(p): 
+                    dIn.read_direct(buf,source_sel=cacheSel)
+                    oH5[cacheName].create_dataset(sQ, data=buf)
+                else:                 
+                    cacheSteps = range(len(range(Ns,Ne,Nsk)))
+                    oH5[cacheName].create_dataset(sQ, data=cacheSteps)
+            else:
+                dIn.read_direct(buf,source_sel=cacheSel)
+                oH5[cacheName].create_dataset(sQ, data=buf)
+            oH5[cacheName][sQ].attrs.update(dIn.attrs)
+
+    # make a new file every Nsf steps
+        if(n%Nsf==0 and n != 0):
+            oH5.close()
+            if mpiStr is None:
+                fOut = str(n)+'-'+str(Nsf+n)+outTag
+            else:
+                fOut = "{}-{}_{}_{}.{}".format(n,Nsf+n,runTag,mpiStr,outTag)
+            oH5=createfile(iH5,fOut,rootVars,dsetOpts)
+
+    #Close up
+    iH5.close()
+    oH5.close()
+
+
 def create_command_line_parser():
     """Create the command-line argument parser.
     Create the parser for command-line arguments.
@@ -83,6 +198,9 @@ def create_command_line_parser():
     parser.add_argument('-sf',type=int,metavar="nsf",default=250,help="File write stride (default: %(default)s)")
     parser.add_argument('-mpi',type=str,metavar="ijk",default="", help="Comma-separated mpi dimensions (example: '4,4,1', default: noMPI)")
     parser.add_argument('--p',action='store_true', help="Preserve Step # instead of labeling at Step#0") 
+    parser.add_argument('--ncpus',type=int,metavar="ncpus",default=1,help="Number of MPI rank files to slim in parallel (default: %(default)s)")
+    parser.add_argument('-compress',type=str,choices=["none","gzip","lzf"],default="none",help="Compress the output datasets, lzf is only readable through h5py (default: %(default)s)")
+    parser.add_argument('-noshuffle',action='store_true',help="Don't apply the shuffle filter to compressed datasets")
     
     return parser    
 def main():
@@ -103,6 +221,16 @@ def main():
     outTag = args.outH5
     p = args.p
     mpiIn = args.mpi
+    ncpus = args.ncpus
+    if ncpus < 1:
+        parser.error("--ncpus must be at least 1, got {}".format(ncpus))
+
+    #Chunking/filter options for the output datasets, None keeps the input layout
+    dsetOpts = None
+    if args.compress != "none":
+        dsetOpts = {'compression':args.compress,'shuffle':not args.noshuffle}
+        if args.compress == "gzip":
+            dsetOpts['compression_opts'] = 4
 
     N,sIds = cntSteps(fIn)
     N0 = np.sort(sIds)[0]
@@ -125,6 +253,7 @@ def main():
         endTag = '.'.join(fIn.split('.')[1:]) #Exclude anything before the first '.'
         inFiles = []
         outFiles = []
+        mpiStrs = []
         for i in range(mi):
             for j in range(mj):
                 for k in range(mk):
@@ -133,72 +262,24 @@ def main():
                     if os.path.exists(fName):
                         inFiles.append(fName)
                         outFiles.append("{}-{}_{}_{}.{}".format(Ns,Nsf,runTag,mpiStr,outTag))
+                        mpiStrs.append(mpiStr)
     else:
+        runTag = None
         inFiles = [fIn]
         outFiles = [str(Ns)+'-'+str(Nsf)+outTag]
+        mpiStrs = [None]
+
+    if len(inFiles) == 0:
+        sys.exit("No MPI rank files matching {}_<ijk>.{} for decomp {}".format(runTag,endTag,mpiIn))
 
-    for i in range(len(inFiles)):
-        fOut = str(Ns)+'-'+str(Nsf)+outTag
-
-        #Open both files, get to work
-        iH5 = h5py.File(inFiles[i],'r')
-        oH5=createfile(iH5,outFiles[i])
-
-        #Now loop through steps and do same thing
-        nOut = 0
-        for n in range(Ns,Ne,Nsk):
-            if(p):nOut = n
-            gIn = "Step#%d"%(n)
-            gOut = "Step#%d"%(nOut)
-            if(not p): nOut = nOut+1 # use the same group numbers as originally in file - frt
-
-            print("Copying %s to %s"%(gIn,gOut))
-
-            oH5.create_group(gOut)
-            #Root atts
-            for k in iH5[gIn].attrs.keys():
-                aStr = str(k)
-                oH5[gOut].attrs.create(k,iH5[gIn].attrs[aStr])
-            #Root vars
-            for Q in iH5[gIn].keys():
-                sQ = str(Q)
-                #print("\tCopying %s"%(sQ))
-                oH5[gOut].create_dataset(sQ,data=iH5[gIn][sQ])
-                for k in iH5[gIn][sQ].attrs.keys():
-                    aStr = str(k)
-                    oH5[gOut][sQ].attrs.create(k,iH5[gIn][sQ].attrs[aStr])
-        
-        #If cache present
-        #Add the cache after steps, select the same steps for the cache that are contained in the
-        #Ns:Ne:Nsk start,end,stride
-        if cacheName in iH5.keys():
-            for Q in iH5[cacheName].keys():
-                sQ = str(Q)
-               
-                if(sQ == "step"):
-                    if(p): 
-                        oH5[cacheName].create_dataset(sQ, data=iH5[cacheName][sQ][Ns-N0:Ne-N0:Nsk])
-                    else:                 
-                        cacheSteps = range(len(range(Ns,Ne,Nsk)))
-                        oH5[cacheName].create_dataset(sQ, data=cacheSteps)
-                else:
-                    oH5[cacheName].create_dataset(sQ, data=iH5[cacheName][sQ][Ns-N0:Ne-N0:Nsk])
-                for k in iH5[cacheName][sQ].attrs.keys():
-                    aStr = str(k)
-                    oH5[cacheName][sQ].attrs.create(k,iH5[cacheName][sQ].attrs[aStr])
-
-        # make a new file every Nsf steps
-            if(n%Nsf==0 and n != 0):
-                oH5.close()
-                if not doMPI:
-                    fOut = str(n)+'-'+str(Nsf+n)+args.outH5
-                else:
-                    fOut = "{}-{}_{}_{}.{}".format(n,Nsf+n,runTag,mpiStr,outTag)
-                oH5=createfile(iH5,fOut)
-
-        #Close up
-        iH5.close()
-        oH5.close()
+    #Each input file is slimmed independently
+    if ncpus == 1:
+        for i in range(len(inFiles)):
+            slimFile(inFiles[i],outFiles[i],Ns,Ne,Nsk,Nsf,N0,p,outTag,runTag,mpiStrs[i],dsetOpts)
+    else:
+        slim_args = [(inFiles[i],outFiles[i],Ns,Ne,Nsk,Nsf,N0,p,outTag,runTag,mpiStrs[i],dsetOpts) for i in range(len(inFiles))]
+        with Pool(processes=min(ncpus,len(inFiles))) as pool:
+            pool.starmap(slimFile,slim_args)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
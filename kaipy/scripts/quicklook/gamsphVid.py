@@ -196,7 +196,7 @@ def main():
 		if (doRCM and (not args.norcm)):
 			AxRCM = inset_axes(AxL,width="30%",height="30%",loc=3)
 			rcmpp.RCMInset(AxRCM,rcmdata,nStp,mviz.vP)
-			AxRCM.contour(kv.reWrap(gsph.xxc),kv.reWrap(gsph.yyc),kv.reWrap(Bz),[0.0],colors=mviz.bz0Col,linewidths=mviz.cLW)
+			AxRCM.contour(gsph.xxcW,gsph.yycW,kv.reWrap(Bz),[0.0],colors=mviz.bz0Col,linewidths=mviz.cLW)
 			rcmpp.AddRCMBox(AxL)
 
 		if (doMIX and (not args.noion)):
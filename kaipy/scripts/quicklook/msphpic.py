@@ -312,7 +312,7 @@ def makePlot(i,spacecraft,nStp, args, varDict):
             inset_bnds = rcmpp.RCMInset(AxIM, rcmdata, nStp, mviz.vP)
         # Add dBz contours.
         AxIM.contour(
-            kv.reWrap(gsph.xxc), kv.reWrap(gsph.yyc), kv.reWrap(Bz), [0.0],
+            gsph.xxcW, gsph.yycW, kv.reWrap(Bz), [0.0],
             colors=mviz.bz0Col, linewidths=mviz.cLW
         )
             # Show the IM region as a box.
@@ -0,0 +1,73 @@
+import pytest
+import numpy as np
+import h5py
+
+# FILE: tests/gamera/test_magsphereRescale.py
+
+from kaipy.gamera.magsphereRescale import (
+	PushRestartMPI, PullRestartMPI, upGas, upMIX, downMIX, NumG
+)
+
+
+def test_downMIX():
+	Q = np.arange(24, dtype=float).reshape(4, 6)
+	Qr = downMIX(Q)
+	assert Qr.shape == (2, 3)
+	for i in range(2):
+		for j in range(3):
+			assert Qr[i, j] == pytest.approx(Q[2*i:2*i+2, 2*j:2*j+2].mean())
+
+def test_downMIX_odd():
+	rng = np.random.default_rng(0)
+	Q = rng.random((5, 7))
+	Qr = downMIX(Q)
+	assert Qr.shape == (2, 3)
+	assert np.allclose(Qr, downMIX(Q[:4, :6]))
+
+def test_upMIX_downMIX_roundtrip():
+	rng = np.random.default_rng(0)
+	Q = rng.random((3, 4))
+	assert np.allclose(downMIX(upMIX(Q)), Q)
+
+def test_PushPullRestartMPI(tmp_path):
+	rng = np.random.default_rng(0)
+	Ri, Rj, Rk = 2, 2, 1
+	Ns, Nv, Nk, Nj, Ni = 1, 5, 4, 4, 6
+	Ng = (Nk + 2*NumG + 1, Nj + 2*NumG + 1, Ni + 2*NumG + 1)
+	X, Y, Z = rng.random(Ng), rng.random(Ng), rng.random(Ng)
+	G = rng.random((Ns, Nv, Nk, Nj, Ni))
+	oG = rng.random((Ns, Nv, Nk, Nj, Ni))
+	M = rng.random((3, Nk + 1, Nj + 1, Ni + 1))
+	oM = rng.random((3, Nk + 1, Nj + 1, Ni + 1))
+
+	fInA = str(tmp_path / "attrs.h5")
+	with h5py.File(fInA, 'w') as f:
+		f.attrs['time'] = 1.5
+		f.attrs['nRes'] = 3
+
+	bStr = str(tmp_path / "msphere")
+	PushRestartMPI(bStr, 0, Ri, Rj, Rk, X, Y, Z, G, M, oG, oM, fInA)
+
+	with h5py.File(str(tmp_path / "merged.h5"), 'w') as oH5:
+		Gp, Mp, G0p, oGp, oMp = PullRestartMPI(bStr, 0, Ri, Rj, Rk, oH5=oH5)
+		assert oH5.attrs['time'] == 1.5
+		assert oH5.attrs['nRes'] == 3
+
+	assert G0p is None
+	assert np.array_equal(Gp, G)
+	assert np.array_equal(oGp, oG)
+	assert np.array_equal(Mp, M)
+	assert np.array_equal(oMp, oM)
+
+def test_upGas():
+	rng = np.random.default_rng(0)
+	Ns, Nv, Nk, Nj, Ni = 1, 2, 2, 3, 4
+	G = rng.random((Ns, Nv, Nk, Nj, Ni))
+	dV = rng.random((Nk, Nj, Ni)) + 0.5
+	dVu = rng.random((2*Nk, 2*Nj, 2*Ni)) + 0.5
+	Gu = upGas(None, None, None, G, None, None, None, dV=dV, dVu=dVu)
+	assert Gu.shape == (Ns, Nv, 2*Nk, 2*Nj, 2*Ni)
+	# Conservative, and uniform within each 2x2x2 block
+	for v in range(Nv):
+		assert (Gu[0, v]*dVu).sum() == pytest.approx((G[0, v]*dV).sum())
+	assert np.allclose(Gu[:, :, ::2, ::2, ::2], Gu[:, :, 1::2, 1::2, 1::2])
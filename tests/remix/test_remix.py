@@ -15,6 +15,7 @@ def test_get_data(mix_file):
     assert 'Y' in data
     assert 'R' in data
     assert 'THETA' in data
+    assert np.allclose(data['THETA_POLAR'], np.arcsin(data['R']))
 
 def test_init_vars(mix_file):
     r = remix.remix(mix_file, 0)
@@ -31,13 +32,6 @@ def test_get_spherical(mix_file):
     assert r.shape == x.shape
     assert theta.shape == y.shape
 
-def test_distance(mix_file):
-    r = remix.remix(mix_file, 0)
-    p0 = (0, 0, 0)
-    p1 = (1, 1, 1)
-    dist = r.distance(p0, p1)
-    assert dist == pytest.approx(np.sqrt(3))
-
 def test_calcFaceAreas(mix_file):
     r = remix.remix(mix_file, 0)
     x = r.ion['X']
@@ -67,6 +61,9 @@ def test_cartesianCellCenters(mix_file):
     assert yc.shape == r.variables['potential']['data'].shape
     assert theta.shape == r.variables['potential']['data'].shape
     assert phi.shape == r.variables['potential']['data'].shape
+    with pytest.raises(ValueError):
+        xc += 1.
+    assert np.array_equal(r.cartesianCellCenters()[0], xc)
 
 def test_hCurrents(mix_file):
     r = remix.remix(mix_file, 0)
@@ -91,4 +88,217 @@ def test_BSFluxTubeInt(mix_file):
     intx, inty, intz = r.BSFluxTubeInt(xyz, Rinner=2.0)
     assert intx.shape == (Nlat, Nlon, 2)
     assert inty.shape == (Nlat, Nlon, 2)
-    assert intz.shape == (Nlat, Nlon, 2)
\ No newline at end of file
+    assert intz.shape == (Nlat, Nlon, 2)
+
+def test_calcFaceAreas_loop(mix_file):
+    r = remix.remix(mix_file, 0)
+    x = r.ion['X'][:6, :5]
+    y = r.ion['Y'][:6, :5]
+    z = np.sqrt(1.0 - x**2 - y**2)
+    areas = r.calcFaceAreas(x, y)
+    for i in range(5):
+        for j in range(4):
+            p = lambda a, b: np.array([x[a, b], y[a, b], z[a, b]])
+            left = np.linalg.norm(p(i, j) - p(i, j+1))
+            right = np.linalg.norm(p(i+1, j) - p(i+1, j+1))
+            top = np.linalg.norm(p(i, j+1) - p(i+1, j+1))
+            bot = np.linalg.norm(p(i, j) - p(i+1, j))
+            assert areas[i, j] == pytest.approx(0.25*(left + right)*(top + bot))
+
+def test_get_area(mix_file):
+    r = remix.remix(mix_file, 0)
+    areas = r._get_area(2.0)
+    assert np.allclose(areas, 4.0*r.calcFaceAreas(r.ion['X'], r.ion['Y']))
+    cached = r._areaMixGrid
+    r._get_area(3.0)
+    assert r._areaMixGrid is cached
+
+def test_bsSheetSum():
+    # unit x-current at the origin seen from (0,1,0): j x R/|R|^3 = (0,0,1)
+    one = np.ones(1)
+    zero = np.zeros(1)
+    Ix, Iy, Iz = remix._bsSheetSum(zero, zero, zero, one, zero, zero, one, zero, one, zero)
+    assert np.allclose([Ix[0], Iy[0], Iz[0]], [0., 0., 1.])
+
+# sizes below, at and not dividing the kernel's block size (remix.bsBlock = 128)
+@pytest.mark.parametrize("nSrc, nDest", [(60, 40), (128, 128), (130, 130), (257, 3), (1, 130)])
+def test_bsSheetSum_numba_matches_numpy(nSrc, nDest):
+    pytest.importorskip("numba")
+    rng = np.random.default_rng(0)
+    src = [rng.uniform(-1., 1., nSrc) for _ in range(7)]
+    src[6] = rng.uniform(0.1, 1., nSrc)
+    dst = [rng.uniform(2., 3., nDest) for _ in range(3)]
+    I = remix._bsSheetSum(*src, *dst)
+    IXP = remix._bsSheetSumXP(np, *src, *dst)
+    for a, b in zip(I, IXP):
+        assert np.allclose(a, b, rtol=1e-10, atol=0.)
+
+def test_init_vars_south(mix_file):
+    r = remix.remix(mix_file, 0)
+    r.ion['Field-aligned current SOUTH'] = np.random.rand(Nlat, Nlon)
+    r.init_vars('south')
+    assert np.array_equal(r.variables['current']['data'], r.ion['Field-aligned current SOUTH'][:, ::-1].astype(np.float32))
+    r.ion['Field-aligned current NORTH'] = np.random.rand(Nlat, Nlon)
+    r.init_vars('north')
+    assert np.array_equal(r.variables['current']['data'], -r.ion['Field-aligned current NORTH'].astype(np.float32))
+    assert r.variables['current']['data'].dtype == np.float32
+
+def test_numberFlux(mix_file):
+    r = remix.remix(mix_file, 0)
+    energy = np.array([[0., np.nan], [2., 4.]])
+    eflux = np.array([[1., 1.], [1.6e-9, 3.2e-9]])
+    energy, flux = r._numberFlux(energy, eflux)
+    assert np.array_equal(energy, [[1.e-20, 1.e-20], [2., 4.]])
+    assert np.allclose(flux, [[0., 0.], [0.5, 0.5]])
+
+def test_cornerCoords(mix_file):
+    r = remix.remix(mix_file, 0)
+    tc, rc = r._cornerCoords()
+    assert tc.shape == (Nlat + 1, Nlon + 1)
+    assert rc.shape == (Nlat + 1, Nlon + 1)
+    assert np.all(rc[0] == 0.)
+    assert r._cornerCoords()[0] is tc
+
+def test_dB_keeps_init(mix_file):
+    r = remix.remix(mix_file, 0)
+    r.init_vars('north')
+    potential = r.variables['potential']['data']
+    r.dB(np.array([[1., 1., 1.]]))
+    assert r.variables['potential']['data'] is potential
+    r.init_vars('south')
+    r.dB(np.array([[1., 1., 1.]]))
+    assert r._hemisphere == 'NORTH'
+
+def test_get_data_hemisphere(mix_file):
+    r = remix.remix(mix_file, 0, hemisphere='south')
+    assert 'Potential SOUTH' in r.ion
+    assert not any(k.endswith(' NORTH') for k in r.ion)
+    r.init_vars('south')
+    assert r.Initialized is True
+    with pytest.raises(ValueError, match="Only the SOUTH hemisphere"):
+        r.init_vars('north')
+    with pytest.raises(ValueError, match="only SOUTH was loaded"):
+        r.dB(np.array([[1., 1., 1.]]))
+    with pytest.raises(ValueError, match="got 'nroth'"):
+        remix.remix(mix_file, 0, hemisphere='nroth')
+    with pytest.raises(ValueError, match="got 'east'"):
+        remix.remix(mix_file, 0).init_vars('east')
+
+def test_cornerAvg():
+    a = np.random.rand(5, 7)
+    avg = remix._cornerAvg(a)
+    assert avg.shape == (4, 6)
+    assert avg[2, 3] == pytest.approx(a[2:4, 3:5].mean())
+
+def test_geometry(mix_file):
+    r = remix.remix(mix_file, 0)
+    r.init_vars('north')
+    geom = r._geometry()
+    etheta, ephi, dtheta, dphi = r.efield(returnDeltas=True)
+    assert dtheta is geom['dtheta']
+    assert geom['sin_tc'].shape == etheta.shape
+    xc, yc, theta, phi = r.cartesianCellCenters()
+    assert np.allclose(geom['cos_theta_c'], np.cos(theta))
+    # frame columns are the orthonormal theta and phi unit vectors
+    frame = geom['frame']
+    assert frame.shape == (3, 2) + theta.shape
+    assert np.allclose((frame**2).sum(axis=0), 1.)
+    assert np.allclose((frame[:, 0]*frame[:, 1]).sum(axis=0), 0.)
+
+def test_get_spherical_range(mix_file):
+    r = remix.remix(mix_file, 0)
+    x = np.array([[1., -1., 0.], [1., 0., -1.]])
+    y = np.array([[0., -1., -1.], [1., -2., 0.]])
+    rr, theta = r.get_spherical(x, y)
+    assert np.allclose(theta[:, 1:], [[5*np.pi/4, 3*np.pi/2], [3*np.pi/2, np.pi]])
+    assert np.allclose(theta[:, 0], [-2*np.pi, np.pi/4 - 2*np.pi])
+
+def test_variables_not_shared(mix_file):
+    r1 = remix.remix(mix_file, 0)
+    r2 = remix.remix(mix_file, 0)
+    r1.init_vars('north')
+    r1.variables['potential']['min'] = -50
+    assert 'data' not in r2.variables['potential']
+    assert 'data' not in remix.defaultLimits['potential']
+    assert r2.variables['potential']['min'] == -100
+
+def test_bsSheetSumXP_tiled(monkeypatch):
+    # the numpy path directly, so the tiling is exercised whether or not numba is installed
+    rng = np.random.default_rng(1)
+    nSrc, nDest = 50, 11
+    src = [rng.uniform(-1., 1., nSrc) for _ in range(7)]
+    src[6] = rng.uniform(0.1, 1., nSrc)
+    dst = [rng.uniform(2., 3., nDest) for _ in range(3)]
+    monkeypatch.setattr(remix, 'bsTileBytes', 8*nSrc*nDest)
+    assert remix._bsTile(nSrc) == nDest
+    full = remix._bsSheetSumXP(np, *src, *dst)
+    # 3 destinations per tile, the last tile is partial
+    monkeypatch.setattr(remix, 'bsTileBytes', 8*nSrc*3)
+    tiled = remix._bsSheetSumXP(np, *src, *dst)
+    for a, b in zip(full, tiled):
+        assert np.allclose(a, b, rtol=1e-12, atol=0.)
+
+def test_dB_fac_matches_BSFluxTubeInt(mix_file):
+    r = remix.remix(mix_file, 0)
+    # no conductance, so only the field-aligned currents contribute
+    r.ion['Field-aligned current NORTH'] = np.random.rand(Nlat, Nlon) - 0.5
+    r.init_vars('north')
+    xyz = np.array([[1., 1., 1.], [0.3, -0.5, 1.2]])
+    dBr, dBtheta, dBphi = r.dB(xyz, hallOnly=False)
+
+    x, y, theta, phi, dtheta, dphi, jht, jhp, jpt, jpp, cosd = r.hCurrents()
+    w = (-r.variables['current']['data']*np.sin(theta)*dtheta*dphi*abs(cosd))[:, :, np.newaxis]
+    intx, inty, intz = r.BSFluxTubeInt(xyz, Rinner=2.0*remix.Re/remix.Ri)
+    dBx = remix.Ri*remix.mu0o4pi*np.sum(w*intx, axis=(0, 1))
+    dBy = remix.Ri*remix.mu0o4pi*np.sum(w*inty, axis=(0, 1))
+    dBz = remix.Ri*remix.mu0o4pi*np.sum(w*intz, axis=(0, 1))
+    assert np.allclose(np.hypot(np.hypot(dBr, dBtheta), dBphi)[0, 0], np.sqrt(dBx**2 + dBy**2 + dBz**2))
+    # radial component at the destination
+    rhat = xyz/np.linalg.norm(xyz, axis=1)[:, np.newaxis]
+    assert np.allclose(dBr[0, 0], dBx*rhat[:, 0] + dBy*rhat[:, 1] + dBz*rhat[:, 2])
+
+@pytest.mark.skipif(remix.cupy is not None, reason="cupy is installed")
+def test_dB_gpu_requires_cupy(mix_file):
+    r = remix.remix(mix_file, 0)
+    with pytest.raises(SystemExit):
+        r.dB(np.array([[1., 1., 1.]]), useGPU=True)
+
+def test_dB_float32(mix_file):
+    r = remix.remix(mix_file, 0)
+    for k in r.ion:
+        if k.endswith(' NORTH'):
+            r.ion[k] = np.random.rand(*r.ion[k].shape) + 0.5
+    xyz = np.array([[0.5, 0.2, 0.8], [0.3, -0.5, 1.2]])
+    ref = r.dB(xyz, hallOnly=False)
+    single = r.dB(xyz, hallOnly=False, dtype=np.float32)
+    for a, b in zip(ref, single):
+        assert b.dtype == np.float64
+        assert np.allclose(a, b, rtol=1e-4, atol=1e-5*np.abs(a).max())
+
+def test_fluxTubeGeometry_cached(mix_file):
+    r = remix.remix(mix_file, 0)
+    geom = r._fluxTubeGeometry(1.8, 5)
+    assert geom[0].shape == (5, Nlat, Nlon)
+    assert r._fluxTubeGeometry(1.8, 5) is geom
+    assert r._fluxTubeGeometry(1.8, 6)[0].shape == (6, Nlat, Nlon)
+    assert not any(a.flags.writeable for a in geom)
+
+def test_BSFluxTubeInt_float32(mix_file):
+    r = remix.remix(mix_file, 0)
+    r.init_vars('north')
+    xyz = np.array([[0.5, 0.2, 0.8], [0.3, -0.5, 1.2]])
+    ref = r.BSFluxTubeInt(xyz, Rinner=2.0)
+    single = r.BSFluxTubeInt(xyz, Rinner=2.0, dtype=np.float32)
+    for a, b in zip(ref, single):
+        assert b.dtype == np.float64
+        assert np.allclose(a, b, rtol=1e-4, atol=1e-5*np.nanmax(np.abs(a)), equal_nan=True)
+
+def test_geometry_read_only(mix_file):
+    r = remix.remix(mix_file, 0)
+    r.init_vars('north')
+    etheta, ephi, dtheta, dphi = r.efield(returnDeltas=True)
+    with pytest.raises(ValueError):
+        dtheta *= 2.
+    etheta *= 2.
+    assert np.array_equal(r.efield(returnDeltas=True)[2], dtheta)
+    assert np.allclose(r.efield()[0], 0.5*etheta)
@@ -0,0 +1,398 @@
+import pytest
+import numpy as np
+import kaipy.kaiViz as kv
+
+def test_pyplot_lazy():
+    import subprocess
+    import sys
+    code = "import sys, kaipy.kaiViz; print('matplotlib.pyplot' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+    import matplotlib.pyplot as plt
+    from kaipy.kaiViz import plt as kvPlt
+    assert kv.plt is plt and kvPlt is plt
+    with pytest.raises(AttributeError):
+        kv.notAnAttribute
+
+def test_reWrap():
+    V = np.random.rand(4, 6)
+    Vp = kv.reWrap(V)
+    assert Vp.shape == (4, 7)
+    assert np.array_equal(Vp[:, :6], V)
+    assert np.array_equal(Vp[:, -1], V[:, 0])
+
+def test_reWrap_fortran():
+    V = np.random.rand(6, 4).T
+    Vp = kv.reWrap(V)
+    assert Vp.flags.f_contiguous
+    assert np.array_equal(Vp[:, -1], V[:, 0])
+
+def test_trimArray():
+    Q = np.full((50, 60, 4), 255, dtype=np.uint8)
+    Q[10:21, 5:18, :3] = 0
+    Qt = kv.trimArray(Q, bLenX=4, bLenY=3)
+    # 11x13 block plus border, shaved to even dimensions
+    assert Qt.shape == (16, 20, 4)
+    assert (Qt[:3] == 255).all() and (Qt[:, :4] == 255).all()
+    assert (Qt[3:14, 4:17, :3] == 0).all()
+
+def test_trimFig(tmp_path):
+    from PIL import Image
+    fName = str(tmp_path / "pic.png")
+    Q = np.full((40, 40, 3), 255, dtype=np.uint8)
+    Q[5:10, 7:20] = 0
+    Image.fromarray(Q).save(fName)
+    assert kv.trimFig(fName, bLenX=2) == (16, 8)
+    assert kv.picSz(fName) == (16, 8)
+    fJpg = str(tmp_path / "pic.jpg")
+    Image.fromarray(Q).save(fJpg)
+    assert kv.picSz(fJpg) == (40, 40)
+
+def test_savePic(tmp_path):
+    import matplotlib.pyplot as plt
+    fOut = str(tmp_path / "fig.png")
+    fig = plt.figure(figsize=(2, 2))
+    plt.plot([0, 1], [0, 1])
+    kv.savePic(fOut, dpiQ=50, doClose=True)
+    Nx, Ny = kv.picSz(fOut)
+    assert Nx % 2 == 0 and Ny % 2 == 0
+
+def test_MidpointNormalize():
+    vN = kv.MidpointNormalize(vmin=0, vmax=10, midpoint=2)
+    assert vN(2) == pytest.approx(0.5)
+    assert vN(6) == pytest.approx(0.75)
+    assert np.allclose(vN(np.array([0.0, 1.0, 10.0])), [0.0, 0.25, 1.0])
+    V = np.ma.masked_array([0.0, 1.0], mask=[True, False])
+    assert np.ma.getmask(vN(V)).tolist() == [True, False]
+    vN.vmax = 4
+    assert vN(3) == pytest.approx(0.75)
+
+@pytest.fixture
+def sc_data():
+    import datetime
+    from spacepy import datamodel as dm
+    rng = np.random.default_rng(0)
+    N = 50
+    data = dm.SpaceData()
+    t0 = datetime.datetime(2020, 1, 1)
+    data['Epoch_bin'] = dm.dmarray([t0 + datetime.timedelta(minutes=i) for i in range(N)])
+    data['Density'] = dm.dmarray(rng.random(N))
+    data['MagneticField'] = dm.dmarray(rng.random((N, 3)))
+    data['Ephemeris'] = dm.dmarray(rng.random((N, 3))*6.4e3)
+    data['GAMERA_Density'] = dm.dmarray(rng.random(N), attrs={'UNITS': b'#/cc', 'AXISLABEL': 'n'})
+    data['GAMERA_MagneticField'] = dm.dmarray(rng.random((N, 3)), attrs={'UNITS': b'nT', 'AXISLABEL': 'B'})
+    inDom = np.ones(N)
+    inDom[:5] = 0.0
+    data['GAMERA_inDom'] = dm.dmarray(inDom, attrs={'UNITS': b'', 'AXISLABEL': 'In Domain'})
+    return data
+
+def test_itemPlot(sc_data):
+    import matplotlib.pyplot as plt
+    fig, Ax = plt.subplots()
+    kv.itemPlot(Ax, sc_data, 'Density', 0, 1)
+    obs, mod = Ax.get_lines()
+    assert np.isnan(obs.get_ydata()[:5]).all()
+    assert np.array_equal(mod.get_ydata()[5:], sc_data['GAMERA_Density'][5:])
+    assert Ax.get_ylabel() == 'n [#/cc]'
+    plt.close(fig)
+
+def test_compPlot(sc_data, tmp_path):
+    plotname = str(tmp_path / "comp.png")
+    kv.compPlot(plotname, 'SC', sc_data)
+    Nx, Ny = kv.picSz(plotname)
+    assert Nx % 2 == 0 and Ny % 2 == 0
+
+@pytest.fixture
+def helio_data():
+    import datetime
+    from spacepy import datamodel as dm
+    rng = np.random.default_rng(0)
+    N = 50
+    data = dm.SpaceData()
+    t0 = datetime.datetime(2020, 1, 1)
+    data['Ephemeris_time'] = dm.dmarray([t0 + datetime.timedelta(hours=i) for i in range(N)])
+    data['Ephemeris_Epoch'] = data['Ephemeris_time']
+    data['Ephemeris'] = dm.dmarray(rng.random((N, 3))*1.5e8)
+    for key in ["Speed", "Br", "Density", "Temperature"]:
+        data[key] = dm.dmarray(rng.random(N))
+        data['GAMHELIO_' + key] = dm.dmarray(rng.random(N), attrs={'UNITS': 'u', 'AXISLABEL': key})
+    inDom = np.ones(N)
+    inDom[-5:] = 0.0
+    data['GAMHELIO_inDom'] = dm.dmarray(inDom)
+    return data
+
+def test_helioCompPlot_new(helio_data, tmp_path):
+    plot_file_path = str(tmp_path / "helio.png")
+    kv.helioCompPlot_new(plot_file_path, 'ACE', helio_data)
+    Nx, Ny = kv.picSz(plot_file_path)
+    assert Nx % 2 == 0 and Ny % 2 == 0
+
+def test_renderRGBA():
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=(2.5, 1.3))
+    Q = kv.renderRGBA(fig, dpiQ=37)
+    assert Q.shape == (int(1.3*37), int(2.5*37), 4)
+    assert (Q == 255).all()
+    plt.close(fig)
+
+def test_SetAxLabs():
+    import matplotlib.pyplot as plt
+    fig, Ax = plt.subplots()
+    kv.SetAxLabs(Ax, None, 'Y')
+    fig.canvas.draw()
+    assert Ax.get_xlabel() == ''
+    assert Ax.get_ylabel() == 'Y'
+    assert not any(t.get_visible() for t in Ax.get_xticklabels())
+    assert any(t.get_visible() for t in Ax.get_yticklabels())
+    plt.close(fig)
+
+def test_trajPlot(sc_data, tmp_path):
+    plotname = str(tmp_path / "traj.png")
+    import matplotlib.pyplot as plt
+    fig = kv.getFig((15, 5))
+    kv.trajPlot(plotname, 'SC', sc_data, 1.0/6380.0, fig=fig)
+    Nx, Ny = kv.picSz(plotname)
+    assert Nx % 2 == 0 and Ny % 2 == 0
+    # the magnetosphere panels keep independent limits
+    Ax1, Ax2, Ax3 = fig.axes
+    assert not Ax1.get_shared_x_axes().joined(Ax1, Ax2)
+    assert not Ax2.get_shared_y_axes().joined(Ax2, Ax3)
+    plt.close(fig)
+
+def test_decimateMinMax():
+    N = 10003
+    t = np.arange(N)
+    y = np.random.rand(N)
+    y[5000] = 2.0
+    y[7000] = -1.0
+    y[100:300] = np.nan
+    td, yd = kv.decimateMinMax(t, y, 200)
+    assert len(td) <= 200 + N % 100
+    assert np.all(np.diff(td) >= 0)
+    assert td[-1] == t[-1]
+    assert np.nanmax(yd) == 2.0 and np.nanmin(yd) == -1.0
+    assert np.isnan(yd).any()
+    # Short series are returned untouched
+    ts, ys = kv.decimateMinMax(t[:50], y[:50], 200)
+    assert len(ts) == 50
+
+def test_genEQGrid_getEQVar(tmp_path):
+    import h5py
+    Ni, Nj, Nk = 5, 4, 6
+    X3 = np.random.rand(Ni, Nj, Nk)
+    Y3 = np.random.rand(Ni, Nj, Nk)
+    V = np.random.rand(Ni-1, Nj-1, Nk-1)
+    fIn = str(tmp_path / "eq.h5")
+    with h5py.File(fIn, 'w') as hf:
+        hf.create_dataset("X", data=X3.T)
+        hf.create_dataset("Y", data=Y3.T)
+        hf.create_dataset("Z", data=X3.T)
+        hf.create_group("Step#0").create_dataset("D", data=V.T)
+    xx, yy = kv.genEQGrid(fIn)
+    Np = 2*(Nj-1)
+    assert xx.shape == (Ni, Np+1)
+    for j in range(Np+1):
+        if j < Nj:
+            assert np.array_equal(xx[:, j], X3[:, j, 0])
+            assert np.array_equal(yy[:, j], Y3[:, j, 0])
+        else:
+            assert np.array_equal(xx[:, j], X3[:, Np-j, 0])
+            assert np.array_equal(yy[:, j], -Y3[:, Np-j, 0])
+    vv = kv.getEQVar(fIn)
+    assert vv.shape == (Ni-1, 2*(Nj-1))
+    assert np.array_equal(vv[:, 0], V[:, 0, 0])
+    assert np.array_equal(vv[:, -1], V[:, 0, (Nk-1)//2])
+
+def test_getEQBzD():
+    xx, yy = np.meshgrid(np.linspace(2, 5, 4), np.linspace(-3, 3, 5), indexing='ij')
+    xxc, yyc, BzD = kv.getEQBzD(xx, yy, MagM=-1.0)
+    assert BzD.shape == (3, 4)
+    assert xxc[0, 0] == pytest.approx(2.5)
+    r = np.sqrt(xxc**2 + yyc**2)
+    assert np.allclose(BzD, r**-3)
+
+def test_genNorm_midpoint():
+    vN = kv.genNorm(0, 10, midP=2)
+    assert vN(2) == pytest.approx(0.5)
+    assert np.allclose(vN(np.array([0.0, 1.0, 6.0, 10.0])), [0.0, 0.25, 0.75, 1.0])
+    # Degenerate midpoint still gets a usable norm
+    vN = kv.genNorm(0, 10, midP=10)
+    assert isinstance(vN, kv.MidpointNormalize)
+
+def test_savePic_formats(tmp_path):
+    import matplotlib.pyplot as plt
+    for ext in ["jpg", "pdf"]:
+        fOut = str(tmp_path / ("fig." + ext))
+        plt.figure(figsize=(2, 2))
+        plt.plot([0, 1], [0, 1])
+        kv.savePic(fOut, dpiQ=50, doClose=True)
+        with open(fOut, 'rb') as f:
+            assert len(f.read()) > 0
+    Nx, Ny = kv.picSz(str(tmp_path / "fig.jpg"))
+    assert Nx % 2 == 0 and Ny % 2 == 0
+
+def test_getFig_reuse(sc_data, tmp_path):
+    import matplotlib.pyplot as plt
+    nFig = len(plt.get_fignums())
+    kv.compPlot(str(tmp_path / "c0.png"), 'SC', sc_data)
+    assert len(plt.get_fignums()) == nFig
+    fig = kv.getFig((10, 10))
+    assert kv.getFig((10, 10)) is not fig
+    plt.close()
+    kv.compPlot(str(tmp_path / "c1.png"), 'SC', sc_data, fig=fig)
+    kv.compPlot(str(tmp_path / "c2.png"), 'SC', sc_data, fig=fig)
+    assert plt.fignum_exists(fig.number)
+    assert kv.picSz(str(tmp_path / "c0.png")) == kv.picSz(str(tmp_path / "c2.png"))
+    assert kv.picSz(str(tmp_path / "c1.png")) == kv.picSz(str(tmp_path / "c2.png"))
+    plt.close(fig)
+
+def test_addEarth2D():
+    import matplotlib.pyplot as plt
+    fig, Ax = plt.subplots()
+    pD, pN = kv.addEarth2D(Re=2, ax=Ax)
+    vD = pD.get_path().vertices
+    assert np.allclose(pD.get_path().get_extents().bounds, [0, -2, 2, 4])
+    assert vD[:, 0].min() > -1e-12
+    assert pN.get_path().vertices[:, 0].max() < 1e-12
+    assert kv.addEarth2D(Re=2, ax=Ax)[0].get_path() is pD.get_path()
+    plt.close(fig)
+
+def test_compPlot_pressure(sc_data, tmp_path):
+    from spacepy import datamodel as dm
+    N = len(sc_data['Density'])
+    sc_data['Pressure'] = dm.dmarray(np.random.rand(N))
+    sc_data['GAMERA_Pressure'] = dm.dmarray(np.random.rand(N), attrs={'UNITS': b'nPa', 'AXISLABEL': 'P'})
+    import matplotlib.pyplot as plt
+    fig = kv.getFig((10, 10))
+    kv.compPlot(str(tmp_path / "comp.png"), 'SC', sc_data, fig=fig)
+    axes = fig.axes
+    plt.close(fig)
+    assert [Ax.get_ylabel() for Ax in axes] == ['n [#/cc]', 'P [nPa]', 'Bx [nT]', 'By [nT]', 'Bz [nT]']
+
+def test_inDomain(sc_data):
+    inDom = np.asarray(sc_data['GAMERA_inDom']) != 0.0
+    V = kv.inDomain(sc_data['MagneticField'], inDom, 1)
+    assert type(V) is np.ndarray
+    assert np.isnan(V[:5]).all()
+    assert np.array_equal(V[5:], sc_data['MagneticField'][5:, 1])
+
+def test_genNorm_cached():
+    vN1 = kv.genNorm(1, 100, doLog=True)
+    vN2 = kv.genNorm(1, 100, doLog=True)
+    assert vN1 is not vN2
+    assert vN1.callbacks is not vN2.callbacks
+    vN1.vmax = 10
+    assert vN2.vmax == 100
+    assert vN2(10) == pytest.approx(0.5)
+    vN = kv.genNorm(np.array(1.0), np.array([5.0]))
+    assert vN.vmin == 1.0
+
+def test_getCmap():
+    import matplotlib.pyplot as plt
+    cM = kv.getCmap("magma")
+    assert cM.name == "magma"
+    assert kv.getCmap("magma") is cM
+    assert kv.getCmap(cM) is cM
+    fig, AxCB = plt.subplots()
+    cb = kv.genCB(AxCB, kv.genNorm(0, 1), cbT="T", cM="magma", Ntk=3)
+    assert cb.cmap.name == "magma"
+    plt.close(fig)
+
+def test_timeRangeStr():
+    import datetime
+    t0 = datetime.datetime(2020, 1, 2, 3, 4, 5)
+    t1 = np.datetime64('2020-02-03T04:05:06')
+    assert kv.timeRangeStr(t0, t1) == "01/02/2020 - 03:04:05 to 02/03/2020 - 04:05:06"
+    t0 = np.datetime64('2020-01-02T03:04:05.250')
+    assert kv.timeRangeStr(t0, t1) == "01/02/2020 - 03:04:05 to 02/03/2020 - 04:05:06"
+    assert kv.timeRangeStr(t0, t1, fmt="%Y") == "2020 to 2020"
+
+def test_helioTrajPlot(helio_data, tmp_path):
+    plot_file_path = str(tmp_path / "helioTraj.png")
+    import matplotlib.pyplot as plt
+    fig = kv.getFig((15, 5))
+    kv.helioTrajPlot(plot_file_path, 'ACE', helio_data, fig=fig)
+    Nx, Ny = kv.picSz(plot_file_path)
+    assert Nx % 2 == 0 and Ny % 2 == 0
+    ax1, ax2, ax3 = fig.axes
+    plt.close(fig)
+    assert ax2.get_shared_x_axes().joined(ax1, ax2)
+    assert ax3.get_shared_y_axes().joined(ax2, ax3)
+    assert not ax3.get_shared_x_axes().joined(ax1, ax3)
+    nFig = len(plt.get_fignums())
+    with pytest.raises(TypeError, match="Nope"):
+        kv.helioTrajPlot(plot_file_path, 'Nope', helio_data)
+    assert len(plt.get_fignums()) == nFig
+
+def test_renderRGBA_matches_savefig():
+    import io
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=(2, 1.5))
+    plt.plot([0, 1], [1, 0])
+    buf = io.BytesIO()
+    fig.savefig(buf, format='rgba', dpi=40)
+    Q = kv.renderRGBA(fig, dpiQ=40)
+    assert fig.dpi != 40
+    assert Q.tobytes() == buf.getvalue()
+    plt.close(fig)
+
+def test_getFig_layout():
+    import matplotlib.pyplot as plt
+    fig = kv.getFig((3, 2))
+    fig.subplots_adjust(hspace=0)
+    assert kv.getFig((3, 2), layout='constrained', fig=fig) is fig
+    assert 'Constrained' in type(fig.get_layout_engine()).__name__
+    assert kv.getFig((4, 2), fig=fig) is fig
+    assert fig.get_layout_engine() is None
+    assert tuple(fig.get_size_inches()) == (4, 2)
+    assert fig.subplotpars.hspace == pytest.approx(plt.rcParams['figure.subplot.hspace'])
+    plt.close(fig)
+
+def test_trajStride():
+    assert kv.trajStride(10) == 1
+    assert kv.trajStride(100000) == 25
+    assert len(np.arange(100000)[::kv.trajStride(100000)]) == kv.TRAJ_MAX_POINTS
+
+def test_trajIndex():
+    idx = kv.trajIndex(100001)
+    assert idx[0] == 0 and idx[-1] == 100000
+    assert len(idx) == kv.TRAJ_MAX_POINTS + 1
+    assert np.all(np.diff(idx) > 0)
+    # last point already on the stride isn't repeated
+    assert np.array_equal(kv.trajIndex(10), np.arange(10))
+    assert np.array_equal(kv.trajIndex(7, nMax=3), [0, 2, 4, 6])
+    assert len(kv.trajIndex(0)) == 0
+
+def test_plotTrack():
+    import matplotlib.pyplot as plt
+    fig, Ax = plt.subplots()
+    X = np.linspace(-3, 5, 20)
+    lc = kv.plotTrack(Ax, X, X**2)
+    assert np.array_equal(lc.get_segments()[0][:, 1], X**2)
+    assert Ax.get_xlim() == pytest.approx((-3.4, 5.4))
+    y0, y1 = (X**2).min(), (X**2).max()
+    assert Ax.get_ylim() == pytest.approx((y0 - 0.05*(y1 - y0), y1 + 0.05*(y1 - y0)))
+    assert Ax.get_autoscale_on()
+    # later artists still extend the view
+    Ax.plot([10.0], [100.0])
+    assert Ax.get_xlim()[1] >= 10.0 and Ax.get_ylim()[1] >= 100.0
+    plt.close(fig)
+
+def test_plotTrack_no_finite():
+    import matplotlib.pyplot as plt
+    fig, Ax = plt.subplots()
+    kv.plotTrack(Ax, np.full(3, np.nan), np.full(3, np.nan))
+    assert np.all(np.isfinite(Ax.get_xlim()))
+    plt.close(fig)
+
+def test_plotSeries():
+    import matplotlib.pyplot as plt
+    fig, Ax = plt.subplots(figsize=(1, 1))
+    t = np.arange(20)
+    l1, l2 = kv.plotSeries(Ax, t, t*1.0, -t*1.0)
+    assert np.array_equal(l2.get_ydata(), -t)
+    assert l1.get_color() != l2.get_color()
+    t = np.arange(5000)
+    lines = kv.plotSeries(Ax, t, np.sin(t), np.cos(t))
+    assert len(lines) == 2 and len(lines[0].get_xdata()) < 5000
+    plt.close(fig)